@@ -1,37 +1,31 @@
 import streamlit as st
 from streamlit_chat import message
-import openai
-from PIL import Image
-from utils.load_config import LoadConfig
-from utils.app_utils import Apputils
-import json
-import traceback
+from utils import resources, telemetry
+from utils.app_utils import APPCFG, Apputils
+from utils.chat_engine import ChatEngine
 
+# Config, clients and assets are built once per process (see utils/resources.py), not on every rerun
 Apputils = Apputils()
-APPCFG = LoadConfig()
-
-# Initialize OpenAI client with the API key from LoadConfig
-client = openai.OpenAI(api_key=APPCFG.api_key)
+icon = resources.image("images/chatgpt.png")
+telemetry.serve_metrics(APPCFG.telemetry)
 
 # Setting page title and header
-im = Image.open("images/chatgpt.png")
-st.set_page_config(page_title="Real-time Web Search", page_icon=im, layout="wide")
+st.set_page_config(page_title="Real-time Web Search", page_icon=icon, layout="wide")
 st.markdown("<h1 style='text-align: center;'>ChatGPT: Real-time Web Search</h1>", unsafe_allow_html=True)
 
 # Initialise session state variables
-if 'generated' not in st.session_state:
-    st.session_state['generated'] = []
-if 'chat_history' not in st.session_state:
-    st.session_state['chat_history'] = []
-if 'past' not in st.session_state:
-    st.session_state['past'] = []
+if 'memory' not in st.session_state:
+    st.session_state['memory'] = Apputils.new_memory()
+if 'pages' not in st.session_state:
+    st.session_state['pages'] = 1
 if 'model_name' not in st.session_state:
     st.session_state['model_name'] = []
+memory = st.session_state['memory']
 
 # Sidebar
 counter_placeholder = st.sidebar.empty()
 st.sidebar.title("ChatGPT")
-st.sidebar.image("images/chatgpt.png", use_column_width=True)
+st.sidebar.image(icon, use_column_width=True)
 model_name = st.sidebar.radio("Choose a model:", ("GPT-3.5", "GPT-4"))
 clear_button = st.sidebar.button("Clear Conversation", key="clear")
 
@@ -41,11 +35,11 @@ model_map = {
     "GPT-4": "gpt-4"
 }
 
+
 # Reset everything (Clear button)
 if clear_button:
-    st.session_state['generated'] = []
-    st.session_state['chat_history'] = []
-    st.session_state['past'] = []
+    memory.clear()
+    st.session_state['pages'] = 1
     st.session_state['model_name'] = []
 
 # Containers
@@ -72,148 +66,19 @@ with container:
         submit_button = st.form_submit_button(label='Submit')
     
     if user_input:
-        chat_history = f"# Chat history:\n{st.session_state['chat_history'][-2:]}\n\n"
-        query = f"# User new question:\n {user_input}"
-        messages = [
-            {"role": "system", "content": str(APPCFG.llm_function_caller_system_role)},
-            {"role": "user", "content": chat_history + query}
-        ]
-
-        # First LLM Model: to decide which function to call
-        first_llm_response = Apputils.ask_llm_function_caller(
-            gpt_model=model_map[model_name],
-            temperature=APPCFG.temperature,
-            messages=messages,
-            function_json_list=Apputils.wrap_functions()
+        answer_placeholder = st.empty()
+        turn = ChatEngine.run_turn(
+            memory, user_input, model_map[model_name],
+            on_token=lambda text: answer_placeholder.markdown(text + "▌")
         )
-        st.session_state['past'].append(user_input)
-
-        if not first_llm_response:
-            st.session_state['generated'].append("Error: Failed to get response from LLM. Please try again.")
-            chat_history = str(
-                (f"User query: {user_input}",
-                 "Response: Error: Failed to get response from LLM. Please try again.")
-            )
-            st.session_state['chat_history'].append(chat_history)
-            print("No response from first LLM call")
-        else:
-            message_dict = first_llm_response.choices[0].message.model_dump()
-            print("message_dict:", message_dict)
-            if first_llm_response.choices[0].message.tool_calls:
-                try:
-                    tool_call = first_llm_response.choices[0].message.tool_calls[0]
-                    func_name = tool_call.function.name
-                    print("called function:", func_name)
-                    web_search_result = Apputils.execute_json_function(first_llm_response)
-                    if not web_search_result:
-                        web_search_results = "\n\n# Web search results:\nNo valid links found. Try searching on platforms like YouTube, LinkedIn Learning, or academic sites."
-                    else:
-                        # Format results based on function type
-                        if func_name == "search_news":
-                            formatted_results = "\n".join(
-                                [
-                                    f"- {r.get('title', 'Untitled')} ({r.get('source', 'Unknown')}): "
-                                    f"{r.get('description', 'No description')} [Link: {r.get('url')}]"
-                                    for r in web_search_result if r.get('url')
-                                ]
-                            )
-                        elif func_name == "search_video":
-                            formatted_results = "\n".join(
-                                [
-                                    f"- {r.get('title', 'Untitled')} ({r.get('uploader', 'Unknown')}, Duration: {r.get('duration', 'N/A')}): "
-                                    f"{r.get('description', 'No description')} [Link: {r.get('url')}]"
-                                    for r in web_search_result if r.get('url')
-                                ]
-                            )
-                        elif func_name == "search_pdf":
-                            formatted_results = "\n".join(
-                                [
-                                    f"- {r.get('title', 'Untitled')} ({r.get('source', 'Unknown')}): "
-                                    f"{r.get('description', 'No description')} [Link: {r.get('url')}]"
-                                    for r in web_search_result if r.get('url')
-                                ]
-                            )
-                        else:
-                            formatted_results = "\n".join(
-                                [
-                                    f"- {r.get('title', 'Untitled')} ({r.get('source', 'Unknown')}): "
-                                    f"{r.get('description', 'No description')} [Link: {r.get('url')}]"
-                                    for r in web_search_result if r.get('url')
-                                ]
-                            )
-                        web_search_results = f"\n\n# Web search results:\n{formatted_results or 'No valid links found. Try searching on platforms like YouTube, LinkedIn Learning, or academic sites.'}"
-                    messages = [
-                        {"role": "system", "content": str(APPCFG.llm_system_role)},
-                        {"role": "user", "content": chat_history + query + web_search_results}
-                    ]
-                    print('messages:', messages)
-                    # Second LLM Model: to generate the final response
-                    second_llm_response = Apputils.ask_llm_chatbot(
-                        gpt_model=model_map[model_name],
-                        temperature=APPCFG.temperature,
-                        messages=messages
-                    )
-                    if not second_llm_response:
-                        raise Exception("Failed to get response from second LLM call")
-                    st.session_state['generated'].append(
-                        second_llm_response.choices[0].message.content
-                    )
-                    chat_history = str(
-                        (f"User query: {user_input}",
-                         f"Response: {second_llm_response.choices[0].message.content}")
-                    )
-                    st.session_state['chat_history'].append(chat_history)
-                except Exception as e:
-                    print(f"Error in function call: {str(e)}")
-                    traceback.print_exc()
-                    messages = [
-                        {"role": "system", "content": str(APPCFG.llm_system_role)},
-                        {"role": "user", "content": chat_history + query + "\n\n# Web search results:\nNo valid links found. Try searching on platforms like YouTube, LinkedIn Learning, or academic sites."}
-                    ]
-                    second_llm_response = Apputils.ask_llm_chatbot(
-                        gpt_model=model_map[model_name],
-                        temperature=APPCFG.temperature,
-                        messages=messages
-                    )
-                    error_message = f"Error in function call: {str(e)}. Falling back to LLM knowledge."
-                    if second_llm_response:
-                        st.session_state['generated'].append(
-                            second_llm_response.choices[0].message.content
-                        )
-                        chat_history = str(
-                            (f"User query: {user_input}",
-                             f"Response: {second_llm_response.choices[0].message.content}")
-                        )
-                    else:
-                        st.session_state['generated'].append(error_message)
-                        chat_history = str(
-                            (f"User query: {user_input}",
-                             f"Response: {error_message}")
-                        )
-                    st.session_state['chat_history'].append(chat_history)
-            else:
-                try:
-                    chat_history = str(
-                        (f"User Query: {user_input}",
-                         f"Response: {first_llm_response.choices[0].message.content}")
-                    )
-                    st.session_state['chat_history'].append(chat_history)
-                    st.session_state['generated'].append(
-                        first_llm_response.choices[0].message.content
-                    )
-                except Exception as e:
-                    print(f"Error in direct response: {str(e)}")
-                    st.session_state['generated'].append(
-                        "Error: Failed to process direct response. Please try again."
-                    )
-                    chat_history = str(
-                        (f"User query: {user_input}",
-                         "Response: Error: Failed to process direct response. Please try again.")
-                    )
-                    st.session_state['chat_history'].append(chat_history)
+        answer_placeholder.empty()
+        st.session_state['prompt_tokens'] = turn.prompt_tokens
 
-if st.session_state['generated']:
+if memory.total_turns:
     with response_container:
-        for i in range(len(st.session_state['generated'])):
-            message(st.session_state['past'][i], is_user=True, key=str(i) + '_user')
-            message(st.session_state['generated'][i], key=str(i))
\ No newline at end of file
+        if memory.total_turns > st.session_state['pages'] * memory.page_size:
+            if st.button("Show older messages", key="older"):
+                st.session_state['pages'] += 1
+        for i, question, answer in memory.page(st.session_state['pages']):
+            message(question, is_user=True, key=str(i) + '_user')
+            message(answer, key=str(i))
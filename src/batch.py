@@ -0,0 +1,216 @@
+"""
+Batch mode: run many queries through the chat turn pipeline, e.g. for evaluation or to warm the
+search caches and the local index.
+
+    python src/batch.py queries.jsonl results.jsonl --concurrency 8
+    python src/batch.py queries.jsonl warmup.jsonl --search-only
+
+Each input line is a JSON object with a `query` (or `message`) and optionally an `id` and a
+`model`; a bare JSON string is also accepted. Lines without an `id` are identified by their line
+number. Every query is answered as the first turn of a fresh, in-memory session.
+
+Results are appended to the output file as they complete, one JSON object per line with the
+answer, the tool calls and the time spent in each stage. The output file is the checkpoint: run
+the same command again after an interruption and the queries already in it are skipped. With
+`--retry-failed` the failed ones are run again (the last line for an id wins).
+
+Searches share the process-wide rate limiter, cache and coalescing of the app, so `--concurrency`
+only bounds how many turns are in progress at once.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+from utils.app_utils import APPCFG
+from utils.chat_engine import ChatEngine
+from utils.conversation_memory import ConversationMemoryFactory
+from utils.telemetry import get_logger, percentile
+
+STAGES = ("total", "first_token", "route", "function_caller", "tools", "prepare", "answer")
+
+log = get_logger("batch")
+
+
+def read_queries(path: str) -> Iterator[Dict]:
+    """
+    Yield `{"id", "query", "model"}` records from a JSONL file, skipping lines without a query.
+    """
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                log.warning("Skipping line %d of %s: %s", line_number, path, e)
+                continue
+            if isinstance(record, str):
+                record = {"query": record}
+            query = str(record.get("query") or record.get("message") or "").strip() if isinstance(record, dict) else ""
+            if not query:
+                log.warning("Skipping line %d of %s: no query", line_number, path)
+                continue
+            yield {"id": str(record.get("id", line_number)), "query": query, "model": record.get("model")}
+
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    The ids already answered in an existing output file. A line cut short by an interruption is ignored.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if retry_failed and row.get("status") != "ok":
+                done.discard(row.get("id"))
+            else:
+                done.add(row.get("id"))
+    return done
+
+
+class ResultWriter:
+    """
+    Appends result rows to a JSONL file as they complete. Every row is flushed right away and the
+    file is synced to disk every `fsync_every` rows, so an interrupted run loses at most the rows
+    still in flight.
+    """
+    def __init__(self, path: str, fsync_every: int = 20) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a+", encoding="utf-8")
+        self.fsync_every = max(1, fsync_every)
+        self.rows = 0
+        self._lock = threading.Lock()
+        # Terminate a line left unfinished by a previous run before appending to it
+        if self.file.tell():
+            self.file.seek(self.file.tell() - 1)
+            if self.file.read(1) != "\n":
+                self.file.write("\n")
+
+    def write(self, row: Dict) -> None:
+        with self._lock:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.rows += 1
+            if self.rows % self.fsync_every == 0:
+                os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+def run_query(memories: ConversationMemoryFactory, record: Dict, model: str, generate: bool) -> Dict:
+    row = {"id": record["id"], "query": record["query"], "model": record["model"] or model}
+    try:
+        result = ChatEngine.run_turn(memories.create(uuid.uuid4().hex), record["query"], row["model"],
+                                     generate=generate)
+    except Exception as e:
+        log.warning("Query %s failed: %s", record["id"], e)
+        return dict(row, status="failed", error=str(e), finished_at=time.time())
+    failed = generate and (not result.answer or result.answer.startswith("Error"))
+    return dict(row, status="failed" if failed else "ok", error=None, **result.to_dict(), finished_at=time.time())
+
+
+def run_batch(records: Iterator[Dict], writer: ResultWriter, model: str, concurrency: int,
+              generate: bool = True) -> List[Dict]:
+    """
+    Run the records with at most `concurrency` turns in progress and write each row as it completes.
+    Input is read lazily, so the file can be larger than memory. On Ctrl-C no new queries are
+    started; the ones in progress are finished and written.
+    """
+    # Batch sessions are single-turn and not meant to be resumed, so they are kept out of the store
+    memories = ConversationMemoryFactory.from_config(dict(APPCFG.conversation_memory, db_path=None))
+    rows: List[Dict] = []
+    pending: Set[Future] = set()
+
+    def collect(done: Set[Future]) -> None:
+        for future in done:
+            row = future.result()
+            writer.write(row)
+            rows.append(row)
+            log.info("%s %s in %.2fs", row["id"], row["status"], row.get("timings", {}).get("total", 0.0))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        try:
+            for record in records:
+                if len(pending) >= concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(pool.submit(run_query, memories, record, model, generate))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        except KeyboardInterrupt:
+            print(f"\nInterrupted: finishing {len(pending)} queries in progress "
+                  "(run the same command again to resume)", file=sys.stderr)
+            collect(wait(pending)[0])
+            raise
+    return rows
+
+
+def print_summary(rows: List[Dict], skipped: int, elapsed: float) -> None:
+    failed = sum(row["status"] != "ok" for row in rows)
+    print(f"{len(rows)} queries in {elapsed:.1f}s ({failed} failed, {skipped} already done)")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        values = [row["timings"][stage] for row in rows if stage in row.get("timings", {})]
+        if values:
+            print(f"{stage:<16}{len(values):>7}{percentile(values, 50) * 1000:>10.1f}"
+                  f"{percentile(values, 95) * 1000:>10.1f}{percentile(values, 99) * 1000:>10.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    config = APPCFG.batch
+    parser = argparse.ArgumentParser(description="Run queries from a JSONL file through the chat pipeline.")
+    parser.add_argument("input", help="JSONL file of queries")
+    parser.add_argument("output", help="JSONL file the results are appended to; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=config.get("concurrency", 4))
+    parser.add_argument("--model", default=config.get("model") or APPCFG.gpt_model)
+    parser.add_argument("--search-only", action="store_true",
+                        help="stop after the searches, without generating answers (warms the caches and index)")
+    parser.add_argument("--retry-failed", action="store_true", help="run the queries that failed before again")
+    parser.add_argument("--fsync-every", type=int, default=config.get("fsync_every", 20))
+    args = parser.parse_args(argv)
+
+    done = load_checkpoint(args.output, args.retry_failed)
+    skipped = 0
+
+    def remaining() -> Iterator[Dict]:
+        nonlocal skipped
+        for record in read_queries(args.input):
+            if record["id"] in done:
+                skipped += 1
+            else:
+                done.add(record["id"])
+                yield record
+
+    writer = ResultWriter(args.output, args.fsync_every)
+    start = time.perf_counter()
+    try:
+        rows = run_batch(remaining(), writer, args.model, max(1, args.concurrency), not args.search_only)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        writer.close()
+    print_summary(rows, skipped, time.perf_counter() - start)
+    return 1 if any(row["status"] != "ok" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
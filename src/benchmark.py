@@ -0,0 +1,211 @@
+"""
+Offline benchmark of the chat turn pipeline.
+
+DuckDuckGo and OpenAI are replaced by local stand-ins with the latency and failure profile chosen
+from `configs/benchmark.yml`; N sessions then run their turns concurrently through `ChatEngine`,
+the same pipeline the Streamlit app uses. Reports p50/p95/p99 latency per stage and end to end,
+throughput and memory per session, and compares them with the saved baseline of the profile.
+
+    python src/benchmark.py --profile realistic --sessions 16 --turns 5
+    python src/benchmark.py --profile fast --save-baseline
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import yaml
+from pyprojroot import here
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import utils.app_utils as app_utils
+from utils.app_utils import APPCFG, Apputils
+from utils.chat_engine import ChatEngine, TurnResult
+from utils.conversation_memory import ConversationMemoryFactory
+from utils.llm_cache import LLMCache
+from utils.offline_backends import BackendProfile, FakeAsyncOpenAI, FakeDDGS
+from utils.session_pool import SessionPools
+from utils.telemetry import configure_logging, percentile
+from utils.web_search import WebSearch
+
+STAGES = ("total", "first_token", "route", "function_caller", "tools", "prepare", "answer")
+
+
+def build_queries(config: Dict, size: int, seed: int) -> List[str]:
+    queries = [t.format(topic) for topic in config["topics"] for t in config["templates"]]
+    random.Random(seed).shuffle(queries)
+    return queries[:max(1, size)]
+
+
+def install_backends(profile: Dict, app_caches: bool) -> Dict[str, BackendProfile]:
+    """
+    Point the pipeline at the offline backends. Unless `app_caches` is set, every cache, the local
+    index and the conversation store are in-memory only, so every run starts cold.
+    """
+    search = BackendProfile.from_config(profile.get("search"))
+    llm = BackendProfile.from_config(profile.get("llm"))
+
+    def isolated(section: Dict, key: str = "db_path") -> Dict:
+        return dict(section) if app_caches else dict(section, **{key: None})
+
+    WebSearch.configure(search_cache=isolated(APPCFG.search_cache),
+                        session_pool=APPCFG.session_pool,
+                        rate_limit=dict(APPCFG.rate_limit, **profile.get("rate_limit", {})),
+                        local_index=isolated(APPCFG.local_index),
+                        hedging=APPCFG.hedging,
+                        circuit_breaker=APPCFG.circuit_breaker)
+    pool_kwargs = {k: v for k, v in APPCFG.session_pool.items() if k != "timeout"}
+    WebSearch.sessions = SessionPools(functools.partial(FakeDDGS, search), **pool_kwargs)
+    app_utils.LLM_CACHE = LLMCache.from_config(isolated(APPCFG.llm_cache))
+    app_utils.MEMORIES = ConversationMemoryFactory.from_config(isolated(APPCFG.conversation_memory))
+    app_utils.PAGE_FETCHER.enabled = False
+    app_utils.use_async_client_factory(lambda: FakeAsyncOpenAI(llm))
+    return {"search": search, "llm": llm}
+
+
+def run_sessions(sessions: int, turns: int, queries: List[str], model: str, seed: int) -> Dict:
+    """
+    Run `sessions` chat sessions concurrently, each answering `turns` questions in a row.
+    """
+    results: List[TurnResult] = []
+
+    def session(index: int):
+        rng = random.Random(seed + index)
+        memory = Apputils.new_memory()
+        for _ in range(turns):
+            results.append(ChatEngine.run_turn(memory, rng.choice(queries), model))
+        return memory
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        memories = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages = {}
+    for stage in STAGES:
+        values = [r.timings[stage] for r in results if stage in r.timings]
+        if values:
+            stages[stage] = {"count": len(values), "p50": percentile(values, 50),
+                             "p95": percentile(values, 95), "p99": percentile(values, 99)}
+    return {
+        "stages": stages,
+        "turns": len(results),
+        "elapsed": elapsed,
+        "throughput": len(results) / elapsed if elapsed else 0.0,
+        "memory_per_session_kb": (after - before) / len(memories) / 1024,
+        "peak_memory_kb": peak / 1024,
+        "failed_turns": sum(r.answer.startswith("Error") for r in results),
+        "routed_turns": sum(r.routed for r in results),
+        "planned_turns": sum(r.planned for r in results),
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    List the stages and totals that are more than `tolerance` worse than the baseline.
+    Latency differences under 5 ms are ignored as noise.
+    """
+    regressions = []
+    for stage, old in baseline.get("stages", {}).items():
+        new = report["stages"].get(stage)
+        if new is None:
+            continue
+        for q in ("p50", "p95"):
+            if new[q] > old[q] * (1 + tolerance) and new[q] - old[q] > 0.005:
+                regressions.append(f"{stage} {q}: {old[q] * 1000:.1f} ms -> {new[q] * 1000:.1f} ms")
+    if report["throughput"] < baseline.get("throughput", 0) * (1 - tolerance):
+        regressions.append(f"throughput: {baseline['throughput']:.2f} -> {report['throughput']:.2f} turns/s")
+    old_memory = baseline.get("memory_per_session_kb", 0)
+    if old_memory and report["memory_per_session_kb"] > old_memory * (1 + tolerance):
+        regressions.append(f"memory per session: {old_memory:.0f} KB -> {report['memory_per_session_kb']:.0f} KB")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    print(f"\nProfile {report['profile']}: {report['sessions']} sessions x {report['turns_per_session']} turns")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<16}{s['count']:>7}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}")
+    print(f"throughput: {report['throughput']:.2f} turns/s ({report['turns']} turns in {report['elapsed']:.1f}s)")
+    print(f"memory per session: {report['memory_per_session_kb']:.0f} KB (peak {report['peak_memory_kb']:.0f} KB traced)")
+    print(f"failed turns: {report['failed_turns']}, routed without the function-calling LLM: {report['routed_turns']} "
+          f"({report.get('planned_turns', 0)} planned)")
+    for name, stats in report["counters"].items():
+        print(f"{name}: {stats}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    with open(here("configs/benchmark.yml")) as file:
+        config = yaml.safe_load(file)
+    parser = argparse.ArgumentParser(description="Offline benchmark of the chat turn pipeline.")
+    parser.add_argument("--profile", default="realistic", choices=sorted(config["profiles"]))
+    parser.add_argument("--sessions", type=int, default=config["sessions"])
+    parser.add_argument("--turns", type=int, default=config["turns"])
+    parser.add_argument("--query-pool", type=int, default=config["query_pool"])
+    parser.add_argument("--model", default=config["model"])
+    parser.add_argument("--seed", type=int, default=config["seed"])
+    parser.add_argument("--tolerance", type=float, default=config["tolerance"])
+    parser.add_argument("--app-caches", action="store_true",
+                        help="use the app's on-disk caches and index instead of cold in-memory ones")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the profile's baseline")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own log output")
+    args = parser.parse_args(argv)
+
+    backends = install_backends(config["profiles"][args.profile], args.app_caches)
+    queries = build_queries(config["queries"], args.query_pool, args.seed)
+    configure_logging("DEBUG" if args.verbose else "ERROR")
+    report = run_sessions(args.sessions, args.turns, queries, args.model, args.seed)
+    report.update(profile=args.profile, sessions=args.sessions, turns_per_session=args.turns)
+    report["counters"] = {
+        "search backend": backends["search"].stats,
+        "llm backend": backends["llm"].stats,
+        "search cache": WebSearch.cache.stats if WebSearch.cache else {},
+        "llm cache": app_utils.LLM_CACHE.stats if app_utils.LLM_CACHE else {},
+        "coalesced searches": WebSearch.flights.stats,
+        "search hedging": WebSearch.hedger.stats,
+        "circuit breakers": WebSearch.breakers.stats,
+        "query planner": app_utils.PLANNER.stats,
+        "coalesced llm calls": app_utils.LLM_FLIGHTS.stats,
+        "rate limiter": WebSearch.limiter.stats,
+        "local index": WebSearch.index.stats,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    baseline_path = os.path.join(here(config["baseline_dir"]), f"{args.profile}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline for profile '{args.profile}' yet; run with --save-baseline to record one.")
+        return 0
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    if baseline.get("sessions") != args.sessions or baseline.get("turns_per_session") != args.turns:
+        print("Baseline was recorded with a different number of sessions or turns; throughput is not comparable.")
+    regressions = compare(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Headless HTTP/JSON API for the search-augmented chat, served with tornado.
+
+    python src/server.py --port 8000 --workers 4
+
+    POST   /v1/sessions                      -> {"session_id": ...}
+    POST   /v1/sessions/<id>/turns           {"message": ..., "model": ..., "stream": true|false}
+    GET    /v1/sessions/<id>/turns?pages=1   -> the last pages of turns
+    DELETE /v1/sessions/<id>
+    GET    /healthz, /metrics
+
+A turn with `"stream": true` (or `Accept: text/event-stream`) is answered with server-sent events:
+`token` events carry new answer text, `reset` replaces the text sent so far (when the answer
+falls back after a failure) and a final `done` event carries the whole turn. When the server is
+at capacity, turns are refused with 503 and a Retry-After header.
+
+With several workers the listening socket is shared by forked processes. Sessions live in the
+conversation store (`conversation_memory.db_path`), so any worker can serve any session.
+"""
+from typing import Dict, Optional
+import argparse
+import asyncio
+import json
+import os
+import tornado.httpserver
+import tornado.iostream
+import tornado.netutil
+import tornado.process
+import tornado.web
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    @property
+    def service(self):
+        return self.settings["service"]
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def write_error(self, status_code: int, **kwargs):
+        self.finish({"error": self._reason})
+
+    def json_body(self) -> Dict:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        return body
+
+    def session_or_404(self, call, *args):
+        from utils.chat_service import SessionNotFound
+        try:
+            return call(*args)
+        except SessionNotFound:
+            raise tornado.web.HTTPError(404, reason="Unknown session")
+
+
+class SessionsHandler(BaseHandler):
+    def post(self):
+        self.set_status(201)
+        self.finish({"session_id": self.service.create_session()})
+
+
+class SessionHandler(BaseHandler):
+    def delete(self, session_id: str):
+        self.session_or_404(self.service.delete_session, session_id)
+        self.set_status(204)
+        self.finish()
+
+
+class TurnsHandler(BaseHandler):
+    def get(self, session_id: str):
+        try:
+            pages = max(1, int(self.get_query_argument("pages", "1")))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="'pages' must be an integer")
+        turns = self.session_or_404(self.service.history, session_id, pages)
+        self.finish({"turns": [{"index": i, "question": q, "answer": a} for i, q, a in turns]})
+
+    async def post(self, session_id: str):
+        from utils.chat_service import Overloaded, SessionBusy, SessionNotFound, UnknownModel
+        body = self.json_body()
+        message = str(body.get("message") or "").strip()
+        if not message:
+            raise tornado.web.HTTPError(400, reason="'message' is required")
+        stream = body.get("stream", "text/event-stream" in self.request.headers.get("Accept", ""))
+
+        loop = asyncio.get_running_loop()
+        latest = {"text": ""}
+        changed = asyncio.Event()
+
+        def on_token(text: str) -> None:
+            latest["text"] = text
+            loop.call_soon_threadsafe(changed.set)
+
+        try:
+            turn = self.service.start_turn(session_id, message, body.get("model"), on_token if stream else None)
+        except Overloaded as e:
+            # Answered here rather than raised: tornado clears headers when it renders an HTTPError.
+            self.set_status(503)
+            self.set_header("Retry-After", str(max(1, round(e.retry_after))))
+            self.finish({"error": str(e)})
+            return
+        except UnknownModel:
+            models = ", ".join(sorted(self.service.models))
+            raise tornado.web.HTTPError(400, reason=f"'model' must be one of {models}")
+        except SessionBusy:
+            raise tornado.web.HTTPError(409, reason="A turn is already in progress for this session")
+        except SessionNotFound:
+            raise tornado.web.HTTPError(404, reason="Unknown session")
+
+        if not stream:
+            self.finish((await turn).to_dict())
+            return
+
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+        sent = ""
+        try:
+            while True:
+                waiter = asyncio.ensure_future(changed.wait())
+                await asyncio.wait({turn, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                changed.clear()
+                text = turn.result().answer if turn.done() and not turn.exception() else latest["text"]
+                # Tokens arriving while a write is flushed are sent together in the next event.
+                sent = await self.send_text(sent, text)
+                if turn.done():
+                    break
+            result = turn.result()
+            await self.send_event("done", result.to_dict())
+        except tornado.iostream.StreamClosedError:
+            return  # the client left; the turn still completes and is stored
+        except Exception as e:
+            await self.send_event("error", {"error": str(e)})
+        self.finish()
+
+    async def send_text(self, sent: str, text: str) -> str:
+        if text == sent:
+            return sent
+        if text.startswith(sent):
+            await self.send_event("token", {"text": text[len(sent):]})
+        else:
+            await self.send_event("reset", {"text": text})
+        return text
+
+    async def send_event(self, event: str, data: Dict) -> None:
+        self.write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+        await self.flush()
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        service = self.service
+        self.finish({"status": "ok", "pid": os.getpid(), "in_flight": service.in_flight,
+                     "capacity": service.capacity})
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        from utils.telemetry import METRICS
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(METRICS.render())
+
+
+def make_app(config: Optional[Dict] = None) -> tornado.web.Application:
+    from utils.chat_service import ChatService
+    service = ChatService.from_config(config)
+    return tornado.web.Application([
+        (r"/v1/sessions", SessionsHandler),
+        (r"/v1/sessions/([0-9a-f]+)", SessionHandler),
+        (r"/v1/sessions/([0-9a-f]+)/turns", TurnsHandler),
+        (r"/healthz", HealthHandler),
+        (r"/metrics", MetricsHandler),
+    ], service=service)
+
+
+async def serve(sockets, config: Dict) -> None:
+    server = tornado.httpserver.HTTPServer(make_app(config), idle_connection_timeout=config.get("idle_timeout", 60),
+                                           max_body_size=config.get("max_body_size", 1_000_000))
+    server.add_sockets(sockets)
+    # Import the clients and build the tool schemas now rather than in the first turn
+    from utils import resources
+    await asyncio.to_thread(resources.warm)
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    from utils import resources, telemetry
+    appcfg = resources.config()
+    config = appcfg.server
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the search-augmented chat.")
+    parser.add_argument("--host", default=config.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=config.get("port", 8000))
+    parser.add_argument("--workers", type=int, default=config.get("workers", 1),
+                        help="worker processes sharing the port (0 = one per CPU)")
+    args = parser.parse_args()
+
+    # Bind and fork before the app modules start their threads and open their databases.
+    sockets = tornado.netutil.bind_sockets(args.port, args.host)
+    if args.workers == 1:
+        telemetry.serve_metrics(appcfg.telemetry)
+    else:
+        # Each forked worker has its own metrics, served at /metrics on the API port
+        tornado.process.fork_processes(args.workers)
+    asyncio.run(serve(sockets, config))
+
+
+if __name__ == "__main__":
+    main()
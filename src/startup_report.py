@@ -0,0 +1,48 @@
+"""
+Where the start-up time goes.
+
+    python src/startup_report.py
+    python src/startup_report.py --module utils.chat_service --limit 30
+
+Lists the slowest imports of a cold `import <module>` (measured with `python -X importtime` in a
+fresh interpreter), then the steps recorded while the app modules load and warm up in this
+process: the config, the app singletons and the deferred imports of openai, duckduckgo_search
+and pydantic.
+"""
+from typing import List, Optional
+import argparse
+import importlib
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-startup-report")
+
+from utils import resources
+from utils.telemetry import configure_logging
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report where the start-up time goes.")
+    parser.add_argument("--module", default="utils.app_utils", help="module to import cold")
+    parser.add_argument("--limit", type=int, default=20, help="number of imports listed")
+    args = parser.parse_args(argv)
+
+    print(f"Cold import of {args.module} (cumulative / own ms):")
+    for name, own, cumulative in resources.import_times(args.module, args.limit):
+        print(f"{cumulative * 1000:>9.1f}{own * 1000:>9.1f}  {name}")
+
+    configure_logging("ERROR")
+    start = time.perf_counter()
+    importlib.import_module(args.module)
+    loaded = time.perf_counter()
+    resources.warm()
+    warmed = time.perf_counter()
+    print(f"\nIn process: import {(loaded - start) * 1000:.0f} ms, warm-up {(warmed - loaded) * 1000:.0f} ms")
+    for step, seconds in resources.STARTUP.steps:
+        print(f"{seconds * 1000:>9.1f}  {step}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,64 @@
-from typing import Dict, List
-import inspect
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
 import json
-from inspect import Parameter
-from pydantic import create_model, BaseModel
+import time
+import uuid
+import weakref
+from utils.tool_registry import TOOLS, Tool
+from utils.hedging import remaining_budget
+from utils.intent_router import IntentRouter
+from utils.query_planner import QueryPlanner
+from utils.speculative import Speculation, SpeculativeSearch
+from utils.result_processing import ResultProcessor
+from utils.search_result import SearchResult, format_result
+from utils.prompt_assembler import PromptAssembler
+from utils.conversation_memory import ConversationMemory, ConversationMemoryFactory
+from utils.page_fetcher import PageFetcher
+from utils.llm_cache import LLMCache
+from utils.single_flight import SingleFlight
 from utils.web_search import WebSearch
-import openai
-from utils.load_config import LoadConfig
+from utils.async_runtime import RUNTIME, iterate_sync, run_sync
+from utils import resources, telemetry
+from utils.resources import STARTUP, lazy_import
+from utils.telemetry import METRICS, get_logger, span
 
-APPCFG = LoadConfig()
-client = openai.OpenAI(api_key=APPCFG.api_key)
+openai = lazy_import("openai")
+APPCFG = resources.config()
+telemetry.configure(APPCFG.telemetry)
+log = get_logger("app_utils")
+_started = time.perf_counter()
+WebSearch.configure(search_cache=APPCFG.search_cache, session_pool=APPCFG.session_pool,
+                    rate_limit=APPCFG.rate_limit, local_index=APPCFG.local_index, hedging=APPCFG.hedging,
+                    circuit_breaker=APPCFG.circuit_breaker)
+RUNTIME.max_workers = APPCFG.tool_calls.get("max_workers", 8)
+ROUTER = IntentRouter.from_config(APPCFG.intent_router)
+PLANNER = QueryPlanner.from_config(APPCFG.query_planner)
+SPECULATIVE = SpeculativeSearch.from_config(APPCFG.speculative_search)
+RESULT_PROCESSOR = ResultProcessor.from_config(APPCFG.result_processing)
+PROMPT_ASSEMBLER = PromptAssembler.from_config(APPCFG.prompt_budget)
+MEMORIES = ConversationMemoryFactory.from_config(APPCFG.conversation_memory)
+PAGE_FETCHER = PageFetcher.from_config(APPCFG.page_fetcher)
+LLM_CACHE = LLMCache.from_config(APPCFG.llm_cache)
+LLM_FLIGHTS = SingleFlight()
+for _name, _source in {
+    "search_cache": lambda: WebSearch.cache and WebSearch.cache.stats,
+    "search_flights": lambda: WebSearch.flights.stats,
+    "search_hedging": lambda: WebSearch.hedger.stats,
+    "circuit_breakers": lambda: WebSearch.breakers.stats,
+    "rate_limiter": lambda: WebSearch.limiter.stats,
+    "local_index": lambda: WebSearch.index.stats,
+    "session_pool": lambda: WebSearch.sessions.stats,
+    "intent_router": lambda: ROUTER.stats,
+    "query_planner": lambda: PLANNER.stats,
+    "speculative_search": lambda: SPECULATIVE.stats,
+    "page_fetcher": lambda: PAGE_FETCHER.stats,
+    "llm_cache": lambda: LLM_CACHE and LLM_CACHE.stats,
+    "llm_flights": lambda: LLM_FLIGHTS.stats,
+}.items():
+    METRICS.register_stats(_name, _source)
+STARTUP.record("app singletons", time.perf_counter() - _started)
+log.info("startup: %s", STARTUP.report())
+NO_RESULTS_MESSAGE = "No valid links found. Try searching on platforms like YouTube, LinkedIn Learning, or academic sites."
 model_map = {
     "GPT-3.5": "gpt-3.5-turbo",
     "GPT-4": "gpt-4"
@@ -20,32 +70,17 @@ class Apputils:
         """
         Generate a JSON schema for the input parameters of the given function.
         """
-        kw = {
-            n: (o.annotation if o.annotation != Parameter.empty else str, 
-                ... if o.default == Parameter.empty else o.default)
-            for n, o in inspect.signature(f).parameters.items()
-        }
-        model_config = {"arbitrary_types_allowed": True}
-        s = create_model(f'Input for `{f.__name__}`', __config__=model_config, **kw).schema()
-        return dict(name=f.__name__, description=f.__doc__, parameters=s)
+        tool = TOOLS.get(f.__name__)
+        if tool is None or tool.func is not f:
+            tool = Tool(f)
+        return tool.schema
 
     @staticmethod
     def wrap_functions() -> List:
         """
-        Wrap web search functions and generate JSON schemas for each.
+        Return the cached JSON schemas of all registered web search tools.
         """
-        return [
-            Apputils.jsonschema(WebSearch.retrieve_results),
-            Apputils.jsonschema(WebSearch.search_text),
-            Apputils.jsonschema(WebSearch.search_pdf),
-            Apputils.jsonschema(WebSearch.get_instant),
-            Apputils.jsonschema(WebSearch.search_image),
-            Apputils.jsonschema(WebSearch.search_video),
-            Apputils.jsonschema(WebSearch.search_news),
-            Apputils.jsonschema(WebSearch.search_map),
-            Apputils.jsonschema(WebSearch.give_suggestion),
-            Apputils.jsonschema(WebSearch.user_proxy_for_text_web_search),
-        ]
+        return TOOLS.schemas()
 
     @staticmethod
     def execute_json_function(response) -> List:
@@ -56,72 +91,427 @@ class Apputils:
             tool_call = response.choices[0].message.tool_calls[0]
             func_name = tool_call.function.name
             func_args = json.loads(tool_call.function.arguments)
-            print(f"Executing function: {func_name} with args: {func_args}")
+            log.debug("Executing function: %s with args: %s", func_name, func_args)
         except (AttributeError, IndexError, json.JSONDecodeError) as e:
-            print(f"Error parsing tool call: {str(e)}")
+            log.warning("Error parsing tool call: %s", e)
             return []
 
+        if func_name not in TOOLS:
+            log.warning("Unknown function: %s", func_name)
+            return []
+        if not WebSearch.available(func_name):
+            log.warning("Skipping %s: its search backends are unavailable (circuit open)", func_name)
+            return []
         try:
-            if func_name == 'retrieve_results':
-                result = WebSearch.retrieve_results(**func_args)
-            elif func_name == 'search_text':
-                result = WebSearch.search_text(**func_args)
-            elif func_name == 'search_pdf':
-                result = WebSearch.search_pdf(**func_args)
-            elif func_name == 'search_image':
-                result = WebSearch.search_image(**func_args)
-            elif func_name == 'search_video':
-                result = WebSearch.search_video(**func_args)
-            elif func_name == 'search_news':
-                result = WebSearch.search_news(**func_args)
-            elif func_name == 'get_instant':
-                result = WebSearch.get_instant(**func_args)
-            elif func_name == 'search_map':
-                result = WebSearch.search_map(**func_args)
-            elif func_name == 'give_suggestion':
-                result = WebSearch.give_suggestion(**func_args)
-            elif func_name == 'user_proxy_for_text_web_search':
-                result = WebSearch.user_proxy_for_text_web_search(**func_args)
-            else:
-                print(f"Unknown function: {func_name}")
-                return []
-            print(f"Function {func_name} result: {result}")
+            result = [SearchResult.coerce(r) for r in TOOLS.dispatch(func_name, func_args) or []]
+            log.debug("Function %s returned %d results", func_name, len(result))
             return result
         except Exception as e:
-            print(f"Error executing function {func_name}: {str(e)}")
+            log.warning("Error executing function %s: %s", func_name, e)
+            return []
+
+    @staticmethod
+    def parse_tool_calls(response) -> List[Dict]:
+        """
+        Extract every tool call from an OpenAI ChatCompletion response, in order.
+        Calls whose arguments are not valid JSON are kept with an error so they show up in the results.
+        """
+        try:
+            tool_calls = response.choices[0].message.tool_calls or []
+        except (AttributeError, IndexError) as e:
+            log.warning("Error parsing tool calls: %s", e)
             return []
+        parsed = []
+        for tool_call in tool_calls:
+            call = {"id": tool_call.id, "name": tool_call.function.name, "args": {}, "error": None}
+            try:
+                call["args"] = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError as e:
+                call["error"] = f"Invalid arguments: {str(e)}"
+            parsed.append(call)
+        return parsed
+
+    @staticmethod
+    def execute_tool_calls(response, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Execute all tool calls of an OpenAI ChatCompletion response concurrently.
+        See `AsyncApputils.execute_tool_calls`.
+        """
+        return run_sync(AsyncApputils.execute_tool_calls(response, timeout))
+
+    @staticmethod
+    def run_tool_calls(calls: List[Dict], timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Execute already parsed tool calls concurrently. See `AsyncApputils.run_tool_calls`.
+        """
+        return run_sync(AsyncApputils.run_tool_calls(calls, timeout))
+
+    @staticmethod
+    def start_speculative_search(user_input: str) -> Optional[Speculation]:
+        """
+        Start a text search on the raw user input in the background, if speculative search is enabled.
+        """
+        return SPECULATIVE.start(user_input)
+
+    @staticmethod
+    def attach_speculative_search(speculation: Optional[Speculation], calls: List[Dict]) -> List[Dict]:
+        """
+        Hand a speculative search result to a compatible tool call, or discard it.
+        """
+        return SPECULATIVE.attach(speculation, calls)
+
+    @staticmethod
+    def discard_speculative_search(speculation: Optional[Speculation]) -> None:
+        SPECULATIVE.discard(speculation)
+
+    @staticmethod
+    def search_available(calls: List[Dict]) -> bool:
+        """
+        Whether any of the tool calls could reach a search backend now. False while the circuit
+        breakers of all their backends are open, so the turn can answer from the LLM's own
+        knowledge right away instead of waiting for searches that will fail.
+        """
+        return any(WebSearch.available(call["name"]) for call in calls)
 
     @staticmethod
-    def ask_llm_function_caller(gpt_model: str, temperature: float, messages: List, function_json_list: List):
+    def route_query(user_input: str) -> List[Dict]:
+        """
+        Plan the searches of a question with several parts, or ask the local intent router for
+        the tool call of an obvious search request.
+        Returns an empty list when the function-calling LLM should decide instead.
+        """
+        planned = PLANNER.plan(user_input)
+        if planned:
+            return planned
+        call = ROUTER.route(user_input)
+        return [call] if call else []
+
+    @staticmethod
+    def format_search_results(func_name: str, results: List[SearchResult]) -> str:
+        """
+        Format the results of one search tool as a bullet list for the prompt, with the formatter
+        registered for the tool (see `utils.search_result.result_formatter`).
+        """
+        lines = [format_result(func_name, r) for r in results]
+        return "\n".join(line for line in lines if line is not None)
+
+    @staticmethod
+    def prepare_results(tool_results: List[Dict], query: str) -> List[Dict]:
+        """
+        Deduplicate and re-rank the tool call results against the user query and, when the
+        deep-read stage is enabled, attach excerpts of the top result pages.
+        """
+        tool_results = RESULT_PROCESSOR.process(tool_results, query)
+        if PAGE_FETCHER.enabled:
+            tool_results = run_sync(PAGE_FETCHER.enrich(tool_results, query))
+            WebSearch.index.add_tool_results(tool_results)
+        return tool_results
+
+    @staticmethod
+    def build_search_context(tool_results: List[Dict], query: Optional[str] = None) -> str:
+        """
+        Merge the results of all executed tool calls into one web search results block,
+        keeping the order in which the model requested them. When the user query is given,
+        results are deduplicated, re-ranked against it and trimmed to the configured budget first.
+        """
+        if query:
+            tool_results = RESULT_PROCESSOR.process(tool_results, query)
+        sections = []
+        for call in tool_results:
+            formatted = Apputils.format_search_results(call["name"], call.get("result") or [])
+            if not formatted:
+                continue
+            if len(tool_results) > 1:
+                args = ", ".join(f"{k}={v!r}" for k, v in call["args"].items())
+                formatted = f"## {call['name']}({args})\n{formatted}"
+            sections.append(formatted)
+        body = "\n\n".join(sections) if sections else NO_RESULTS_MESSAGE
+        return f"\n\n# Web search results:\n{body}"
+
+    @staticmethod
+    def new_memory() -> ConversationMemory:
+        """
+        Create the bounded conversation memory of a new chat session.
+        """
+        return MEMORIES.create(uuid.uuid4().hex)
+
+    @staticmethod
+    def build_messages(gpt_model: str, system_role: str, user_input: str, chat_history: List[str],
+                       search_context: str = "", summary: str = "") -> Tuple[List[Dict], Dict[str, int]]:
+        """
+        Assemble the messages for an LLM call within the model's prompt token budget.
+        Returns the messages and the token count of each part of the prompt.
+        """
+        messages, counts = PROMPT_ASSEMBLER.assemble(
+            gpt_model, system_role, user_input, chat_history, search_context, summary
+        )
+        log.debug("Prompt tokens for %s: %s", gpt_model, counts)
+        return messages, counts
+
+    @staticmethod
+    def ask_llm_function_caller(gpt_model: str, temperature: float, messages: List, function_json_list: List,
+                                use_cache: bool = True):
         """
         Generate a response from an OpenAI ChatCompletion API call with tool calls.
         """
+        return run_sync(AsyncApputils.ask_llm_function_caller(gpt_model, temperature, messages, function_json_list,
+                                                              use_cache))
+
+    @staticmethod
+    def ask_llm_chatbot(gpt_model: str, temperature: float, messages: List, use_cache: bool = True):
+        """
+        Generate a response from an OpenAI ChatCompletion API call without specific function calls.
+        """
+        return run_sync(AsyncApputils.ask_llm_chatbot(gpt_model, temperature, messages, use_cache))
+
+    @staticmethod
+    def stream_llm_chatbot(gpt_model: str, temperature: float, messages: List, use_cache: bool = True) -> "ChatStream":
+        """
+        Stream the answer of an OpenAI ChatCompletion API call token by token.
+        """
+        return ChatStream(iterate_sync(AsyncApputils.stream_llm_chatbot(gpt_model, temperature, messages, use_cache)))
+
+
+class ChatStream:
+    """
+    Iterates over the text chunks of a streamed answer while collecting the full text.
+    Records the time to the first token; a failure mid-stream ends the iteration and is kept in `error`.
+    """
+    def __init__(self, chunks: Iterator[str]) -> None:
+        self.chunks = chunks
+        self.text = ""
+        self.error: Optional[Exception] = None
+        self.first_token_latency: Optional[float] = None
+        self.total_latency: Optional[float] = None
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
         try:
-            tools = [{"type": "function", "function": f} for f in function_json_list]
-            response = client.chat.completions.create(
-                model=gpt_model,
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-                temperature=temperature
-            )
+            for chunk in self.chunks:
+                if self.first_token_latency is None:
+                    self.first_token_latency = time.perf_counter() - start
+                    log.debug("First token after %.2fs", self.first_token_latency)
+                self.text += chunk
+                yield chunk
+        except Exception as e:
+            METRICS.inc("llm_errors_total", help="Failed OpenAI calls", kind="stream")
+            log.warning("Error in LLM chatbot stream: %s", e)
+            self.error = e
+        finally:
+            self.total_latency = time.perf_counter() - start
+
+    def consume(self) -> str:
+        """
+        Read the remaining stream and return the full text.
+        """
+        for _ in self:
+            pass
+        return self.text
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_client_factory: "Callable[[], openai.AsyncOpenAI]" = lambda: openai.AsyncOpenAI(api_key=APPCFG.api_key)
+
+
+def use_async_client_factory(factory: "Callable[[], openai.AsyncOpenAI]") -> None:
+    """
+    Create the per-loop LLM clients with `factory` from now on, e.g. to talk to a local stand-in
+    for OpenAI. Clients created before are dropped.
+    """
+    global _client_factory
+    _client_factory = factory
+    _async_clients.clear()
+
+
+def record_usage(kind: str, gpt_model: str, usage) -> None:
+    """
+    Add the token usage reported by an OpenAI response to the metrics.
+    """
+    if usage is None:
+        return
+    for token_type, count in (("prompt", usage.prompt_tokens), ("completion", usage.completion_tokens)):
+        METRICS.inc("llm_tokens_total", count or 0, help="Tokens used by OpenAI calls",
+                    kind=kind, model=gpt_model, type=token_type)
+
+
+def get_async_client() -> "openai.AsyncOpenAI":
+    """
+    Return the AsyncOpenAI client of the running event loop. Each loop gets its own client
+    because the underlying HTTP connection pool is bound to the loop that created it.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _client_factory()
+        _async_clients[loop] = client
+    return client
+
+
+class AsyncApputils:
+    """
+    Async implementation of the LLM and tool-call helpers. `Apputils` runs these on the shared
+    `AsyncRuntime` loop so that blocked requests do not each hold a thread.
+    """
+    @staticmethod
+    async def execute_tool_calls(response, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Execute all tool calls of an OpenAI ChatCompletion response concurrently.
+        """
+        return await AsyncApputils.run_tool_calls(Apputils.parse_tool_calls(response), timeout)
+
+    @staticmethod
+    async def run_tool_calls(calls: List[Dict], timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Execute parsed tool calls concurrently.
+
+        Returns one dict per tool call, in the order given, with the `name`, `args`,
+        `result` (a list, empty on failure) and `error` of each call.
+        A call that fails or exceeds `timeout` seconds (or the turn's search budget) does not
+        affect the others: the turn continues with the results that did arrive.
+        """
+        timeout = APPCFG.tool_calls.get("timeout", 20) if timeout is None else timeout
+        remaining = remaining_budget()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        pending = []
+        for call in calls:
+            call["result"] = []
+            if call.get("error"):
+                continue
+            if call["name"] not in TOOLS:
+                call["error"] = f"Unknown function: {call['name']}"
+                continue
+            log.debug("Executing function: %s with args: %s", call["name"], call["args"])
+            pending.append(call)
+
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(AsyncApputils._run_tool_call(call), timeout) for call in pending),
+            return_exceptions=True
+        )
+        for call, outcome in zip(pending, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                call["error"] = f"Timed out after {timeout}s"
+            elif isinstance(outcome, BaseException):
+                call["error"] = str(outcome)
+            else:
+                # Plugin tools may return plain dicts
+                call["result"] = [SearchResult.coerce(r) for r in outcome or []]
+            if call.get("error"):
+                METRICS.inc("tool_errors_total", help="Tool calls that failed or timed out", tool=call["name"])
+                log.warning("Error executing function %s: %s", call["name"], call["error"])
+        return calls
+
+    @staticmethod
+    async def _run_tool_call(call: Dict) -> List:
+        """
+        Run one tool call, reusing its `prefetched` speculative result when that result is usable.
+        """
+        prefetched = call.pop("prefetched", None)
+        if prefetched is not None:
+            try:
+                result = await asyncio.wrap_future(prefetched)
+            except (asyncio.CancelledError, Exception):
+                result = None
+            if result:
+                return result[:call["args"].get("max_results") or len(result)]
+        with span(f"tool.{call['name']}"):
+            return await TOOLS.adispatch(call["name"], call["args"])
+
+    @staticmethod
+    def _cache_key(use_cache: bool, kind: str, gpt_model: str, temperature: float, messages: List,
+                   tools: Optional[List] = None) -> Optional[str]:
+        """
+        Return the response cache key of an LLM call, or None when the call must not be cached.
+        """
+        if not use_cache or LLM_CACHE is None or not LLM_CACHE.cacheable(temperature):
+            return None
+        return LLM_CACHE.make_key(kind, gpt_model, temperature, messages, tools)
+
+    @staticmethod
+    async def _complete(kind: str, use_cache: bool, gpt_model: str, temperature: float, messages: List,
+                        **request):
+        """
+        Run one ChatCompletion request behind the response cache. Identical requests already in
+        flight (from any session) share that request instead of sending their own.
+        """
+        key = AsyncApputils._cache_key(use_cache, kind, gpt_model, temperature, messages, request.get("tools"))
+        if key is not None:
+            cached = LLM_CACHE.get(key)
+            if cached is not None:
+                return cached
+
+        async def create():
+            with span(f"llm.{kind}", model=gpt_model):
+                response = await get_async_client().chat.completions.create(
+                    model=gpt_model,
+                    messages=messages,
+                    temperature=temperature,
+                    **request
+                )
+            record_usage(kind, gpt_model, response.usage)
+            if key is not None:
+                LLM_CACHE.set(key, response, ttl=LLM_CACHE.ttl_for(kind))
             return response
+
+        flight_key = LLMCache.make_key(kind, gpt_model, temperature, messages, request.get("tools"))
+        return await LLM_FLIGHTS.ado(flight_key, create)
+
+    @staticmethod
+    async def ask_llm_function_caller(gpt_model: str, temperature: float, messages: List, function_json_list: List,
+                                      use_cache: bool = True):
+        """
+        Generate a response from an OpenAI ChatCompletion API call with tool calls.
+        Deterministic calls are answered from the response cache unless `use_cache` is False.
+        """
+        try:
+            tools = [{"type": "function", "function": f} for f in function_json_list]
+            return await AsyncApputils._complete("function_caller", use_cache, gpt_model, temperature, messages,
+                                                 tools=tools, tool_choice="auto")
         except Exception as e:
-            print(f"Error in LLM function caller: {str(e)}")
+            METRICS.inc("llm_errors_total", help="Failed OpenAI calls", kind="function_caller")
+            log.warning("Error in LLM function caller: %s", e)
             return None
 
     @staticmethod
-    def ask_llm_chatbot(gpt_model: str, temperature: float, messages: List):
+    async def ask_llm_chatbot(gpt_model: str, temperature: float, messages: List, use_cache: bool = True):
         """
         Generate a response from an OpenAI ChatCompletion API call without specific function calls.
+        Deterministic calls are answered from the response cache unless `use_cache` is False.
         """
         try:
-            response = client.chat.completions.create(
+            return await AsyncApputils._complete("chatbot", use_cache, gpt_model, temperature, messages)
+        except Exception as e:
+            METRICS.inc("llm_errors_total", help="Failed OpenAI calls", kind="chatbot")
+            log.warning("Error in LLM chatbot: %s", e)
+            return None
+
+    @staticmethod
+    async def stream_llm_chatbot(gpt_model: str, temperature: float, messages: List,
+                                 use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Yield the content deltas of a streamed OpenAI ChatCompletion API call.
+        A cached answer is yielded in one piece; a completed stream is added to the cache.
+        """
+        key = AsyncApputils._cache_key(use_cache, "chatbot", gpt_model, temperature, messages)
+        if key is not None:
+            cached = LLM_CACHE.get(key)
+            if cached is not None:
+                yield cached.choices[0].message.content or ""
+                return
+        parts = []
+        with span("llm.stream", model=gpt_model):
+            stream = await get_async_client().chat.completions.create(
                 model=gpt_model,
                 messages=messages,
-                temperature=temperature
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
             )
-            return response
-        except Exception as e:
-            print(f"Error in LLM chatbot: {str(e)}")
-            return None
\ No newline at end of file
+            async for chunk in stream:
+                if chunk.usage:
+                    record_usage("stream", gpt_model, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        if key is not None and parts:
+            LLM_CACHE.set(key, LLMCache.completion_from_text(gpt_model, "".join(parts)), ttl=LLM_CACHE.ttl_for("chatbot"))
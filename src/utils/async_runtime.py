@@ -0,0 +1,111 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+import asyncio
+import contextvars
+import queue
+import threading
+
+T = TypeVar("T")
+
+
+class AsyncRuntime:
+    """
+    A process-wide event loop running in a daemon thread.
+
+    The synchronous API (`Apputils`, `WebSearch` callers in Streamlit) submits coroutines to this
+    loop instead of creating a new loop per call, so async clients and their connection pools
+    are shared by every session and thread in the process.
+    """
+    def __init__(self, max_workers: int = 8) -> None:
+        self.max_workers = max_workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    loop.set_default_executor(
+                        ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="async-runtime")
+                    )
+                    ready = threading.Event()
+
+                    def run() -> None:
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(ready.set)
+                        loop.run_forever()
+
+                    threading.Thread(target=run, name="async-runtime", daemon=True).start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    @staticmethod
+    async def _in_context(coro: Awaitable[T], context: contextvars.Context) -> T:
+        return await asyncio.get_running_loop().create_task(coro, context=context)
+
+    def _schedule(self, coro: Awaitable[T]) -> "Future[T]":
+        """
+        Schedule a coroutine on the shared loop, running it in a copy of the caller's context
+        so that context variables (e.g. the current tracing span) carry over.
+        """
+        return asyncio.run_coroutine_threadsafe(self._in_context(coro, contextvars.copy_context()), self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Run a coroutine on the shared loop and block until it finishes.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is self._loop:
+            raise RuntimeError("AsyncRuntime.run() called from the runtime's own event loop")
+        return self._schedule(coro).result(timeout)
+
+    def submit(self, coro: Awaitable[T]) -> "Future[T]":
+        """
+        Schedule a coroutine on the shared loop without waiting for it.
+        """
+        return self._schedule(coro)
+
+    def iterate(self, aiterator: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Consume an async iterator on the shared loop, yielding its items synchronously.
+        """
+        items: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump() -> None:
+            try:
+                async for item in aiterator:
+                    items.put((True, item))
+            except BaseException as e:
+                items.put((False, e))
+            finally:
+                items.put((True, done))
+
+        future = self._schedule(pump())
+        try:
+            while True:
+                ok, item = items.get()
+                if not ok:
+                    raise item
+                if item is done:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+
+RUNTIME = AsyncRuntime()
+
+
+def run_sync(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    return RUNTIME.run(coro, timeout)
+
+
+def iterate_sync(aiterator: AsyncIterator[T]) -> Iterator[T]:
+    return RUNTIME.iterate(aiterator)
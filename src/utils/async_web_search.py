@@ -0,0 +1,35 @@
+from typing import Callable
+import asyncio
+import functools
+from utils.web_search import WebSearch
+
+
+def _to_async(func: Callable) -> Callable:
+    """
+    Expose a blocking `WebSearch` method as a coroutine running on the event loop's executor.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return staticmethod(wrapper)
+
+
+class AsyncWebSearch:
+    """
+    Async counterpart of `WebSearch`.
+
+    duckduckgo_search 8.x only ships a blocking client, so each search runs on a worker thread
+    over the same pooled DDGS sessions and result cache as the sync API, leaving the event loop
+    free to serve other conversations meanwhile.
+    """
+    retrieve_results = _to_async(WebSearch.retrieve_results)
+    search_text = _to_async(WebSearch.search_text)
+    search_pdf = _to_async(WebSearch.search_pdf)
+    get_instant = _to_async(WebSearch.get_instant)
+    search_image = _to_async(WebSearch.search_image)
+    search_video = _to_async(WebSearch.search_video)
+    search_news = _to_async(WebSearch.search_news)
+    search_map = _to_async(WebSearch.search_map)
+    give_suggestion = _to_async(WebSearch.give_suggestion)
+    user_proxy_for_text_web_search = _to_async(WebSearch.user_proxy_for_text_web_search)
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+from pyprojroot import here
+from utils.search_result import decode_results, encode_results
+
+
+class TieredCache:
+    """
+    A two-tier key/value cache: a bounded in-process LRU in front of an optional SQLite file
+    that survives restarts. Every entry carries its own expiry time.
+    """
+    def __init__(self, max_entries: int = 512, db_path: Optional[str] = None, default_ttl: float = 3600,
+                 max_disk_entries: int = 10000, dumps: Callable[[Any], Any] = json.dumps,
+                 loads: Callable[[Any], Any] = json.loads, table: str = "cache") -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_disk_entries = max_disk_entries
+        self.dumps = dumps
+        self.loads = loads
+        self.table = table
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "evictions": 0, "expirations": 0, "sets": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires ON {self.table} (expires_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for `key`, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        value = self.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.stats["hits"] += 1
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self.stats["expirations"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store `value` under `key` in both tiers for `ttl` seconds.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, self.dumps(value), expires_at, now)
+                )
+                if self.stats["sets"] % 100 == 0:
+                    self._prune_disk(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _prune_disk(self, now: float) -> None:
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        (count,) = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)", (overflow,)
+            )
+            self.stats["evictions"] += overflow
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+class SearchCache(TieredCache):
+    """
+    Cache for web search results, keyed by method, normalized query and search arguments,
+    with a TTL per search method. Results are stored on disk in the compact binary format of
+    `utils.search_result`.
+    """
+    DEFAULT_TTLS = {
+        "search_news": 15 * 60,
+        "get_instant": 60 * 60,
+        "give_suggestion": 24 * 60 * 60,
+        "search_pdf": 7 * 24 * 60 * 60,
+        "search_video": 24 * 60 * 60,
+        "search_image": 24 * 60 * 60,
+        "search_map": 24 * 60 * 60,
+    }
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, negative_ttl: float = 60,
+                 max_negative_entries: int = 1000, **kwargs) -> None:
+        kwargs.setdefault("dumps", encode_results)
+        kwargs.setdefault("loads", decode_results)
+        super().__init__(table="search_results", **kwargs)
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        # Searches that failed or found nothing, kept in memory only and briefly
+        self.negative_ttl = negative_ttl
+        self.negative = TieredCache(max_entries=max_negative_entries, default_ttl=negative_ttl, table="negative")
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["SearchCache"]:
+        """
+        Build a cache from the `search_cache` section of the app config.
+        Returns None when caching is disabled.
+        """
+        config = dict(config or {})
+        if not config.pop("enabled", True):
+            return None
+        db_path = config.pop("db_path", None)
+        if db_path and not os.path.isabs(db_path):
+            db_path = str(here(db_path))
+        return cls(db_path=db_path, **config)
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(str(query).lower().split())
+
+    @classmethod
+    def make_key(cls, method: str, args: Dict) -> str:
+        normalized = {
+            k: cls.normalize_query(v) if k in ("query", "keywords") else v
+            for k, v in args.items()
+        }
+        return f"{method}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    def ttl_for(self, method: str) -> float:
+        return self.ttls.get(method, self.default_ttl)
+
+    def mark_empty(self, key: str) -> None:
+        if self.negative_ttl > 0:
+            self.negative.set(key, True)
+
+    def recently_empty(self, key: str) -> bool:
+        return self.negative_ttl > 0 and self.negative.get(key) is not None
@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+import time
+from utils.app_utils import APPCFG, Apputils
+from utils.circuit_breaker import CircuitOpen
+from utils.conversation_memory import ConversationMemory
+from utils.telemetry import get_logger, span
+from utils.web_search import WebSearch
+
+log = get_logger("chat_engine")
+
+
+class TurnResult:
+    """
+    The outcome of one chat turn: the answer, the tool calls that were run, the prompt token
+    counts of the answer call and the time spent in each stage (seconds). Each stage is also a
+    tracing span of the turn's trace.
+    """
+    def __init__(self) -> None:
+        self.trace_id: Optional[str] = None
+        self.answer = ""
+        self.tool_calls: List[Dict] = []
+        self.routed = False
+        self.planned = False
+        self.prompt_tokens: Dict[str, int] = {}
+        self.timings: Dict[str, float] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "answer": self.answer,
+            "trace_id": self.trace_id,
+            "routed": self.routed,
+            "planned": self.planned,
+            "tool_calls": [{"name": c["name"], "args": c["args"], "error": c.get("error"),
+                            "results": len(c.get("result") or [])} for c in self.tool_calls],
+            "prompt_tokens": self.prompt_tokens,
+            "timings": self.timings,
+        }
+
+    @contextmanager
+    def stage(self, name: str, **attributes):
+        start = time.perf_counter()
+        try:
+            with span("turn" if name == "total" else f"turn.{name}", **attributes) as current:
+                yield current
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class ChatEngine:
+    """
+    The turn pipeline of the chat, independent of the UI: route or ask the function-calling LLM,
+    run the tool calls, prepare the search context, generate the answer and record the turn.
+    """
+    @staticmethod
+    def generate_answer(gpt_model: str, messages: List, result: TurnResult,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Get the final answer from the chatbot LLM, streaming it through `on_token` (called with
+        the text so far) when streaming is enabled. Returns None if the call failed.
+        """
+        if not APPCFG.streaming:
+            response = Apputils.ask_llm_chatbot(
+                gpt_model=gpt_model,
+                temperature=APPCFG.temperature,
+                messages=messages
+            )
+            return response.choices[0].message.content if response else None
+        stream = Apputils.stream_llm_chatbot(
+            gpt_model=gpt_model,
+            temperature=APPCFG.temperature,
+            messages=messages
+        )
+        for _ in stream:
+            if on_token is not None:
+                on_token(stream.text)
+        if stream.first_token_latency is not None:
+            result.timings["first_token"] = stream.first_token_latency
+        if stream.error or not stream.text:
+            return None
+        return stream.text
+
+    @staticmethod
+    def run_turn(memory: ConversationMemory, user_input: str, gpt_model: str,
+                 on_token: Optional[Callable[[str], None]] = None, generate: bool = True) -> TurnResult:
+        """
+        Answer one user message and add the turn to the session memory.
+        With `generate=False` the turn stops once the search results are prepared (e.g. to warm the
+        caches and the local index) and is not added to the memory.
+        """
+        result = TurnResult()
+        with result.stage("total", model=gpt_model) as turn:
+            result.trace_id = turn.trace_id
+            messages, _ = Apputils.build_messages(
+                gpt_model=gpt_model,
+                system_role=APPCFG.llm_function_caller_system_role,
+                user_input=user_input,
+                chat_history=memory.history_entries(),
+                summary=memory.summary
+            )
+
+            # Query planner and local intent router: questions with several parts and obvious
+            # search requests skip the first LLM call
+            with result.stage("route"):
+                tool_calls = Apputils.route_query(user_input)
+            result.routed = bool(tool_calls)
+            result.planned = any(call.get("planned") for call in tool_calls)
+            first_llm_response = None
+            speculation = None
+            if not tool_calls:
+                # Optionally overlap a text search on the raw input with the first LLM call
+                speculation = Apputils.start_speculative_search(user_input)
+                # First LLM Model: to decide which function to call
+                with result.stage("function_caller"):
+                    first_llm_response = Apputils.ask_llm_function_caller(
+                        gpt_model=gpt_model,
+                        temperature=APPCFG.temperature,
+                        messages=messages,
+                        function_json_list=Apputils.wrap_functions()
+                    )
+
+            if not tool_calls and not first_llm_response:
+                answer = "Error: Failed to get response from LLM. Please try again."
+                log.warning("No response from first LLM call")
+                Apputils.discard_speculative_search(speculation)
+            else:
+                if first_llm_response:
+                    log.debug("message_dict: %s", first_llm_response.choices[0].message.model_dump())
+                    tool_calls = Apputils.parse_tool_calls(first_llm_response)
+                try:
+                    tool_calls = Apputils.attach_speculative_search(speculation, tool_calls)
+                except Exception as e:
+                    log.warning("Could not reuse the speculative search: %s", e)
+                    Apputils.discard_speculative_search(speculation)
+                if tool_calls:
+                    try:
+                        if not Apputils.search_available(tool_calls):
+                            raise CircuitOpen("search backends are unavailable")
+                        # The searches of the turn share one latency budget (`hedging.budget`), which
+                        # starts only now so that the function-calling LLM does not use it up
+                        with result.stage("tools"), WebSearch.budget():
+                            tool_results = Apputils.run_tool_calls(tool_calls)
+                        result.tool_calls = tool_results
+                        log.debug("called functions: %s", [call["name"] for call in tool_results])
+                        with result.stage("prepare"):
+                            tool_results = Apputils.prepare_results(tool_results, query=user_input)
+                            web_search_results = Apputils.build_search_context(tool_results)
+                            messages, result.prompt_tokens = Apputils.build_messages(
+                                gpt_model=gpt_model,
+                                system_role=APPCFG.llm_system_role,
+                                user_input=user_input,
+                                chat_history=memory.history_entries(),
+                                search_context=web_search_results,
+                                summary=memory.summary
+                            )
+                        if not generate:
+                            return result
+                        # Second LLM Model: to generate the final response
+                        with result.stage("answer"):
+                            answer = ChatEngine.generate_answer(gpt_model, messages, result, on_token)
+                        if not answer:
+                            raise Exception("Failed to get response from second LLM call")
+                    except Exception as e:
+                        log.warning("Error in function call: %s", e, exc_info=not isinstance(e, CircuitOpen))
+                        if not generate:
+                            return result
+                        messages, result.prompt_tokens = Apputils.build_messages(
+                            gpt_model=gpt_model,
+                            system_role=APPCFG.llm_system_role,
+                            user_input=user_input,
+                            chat_history=memory.history_entries(),
+                            search_context=Apputils.build_search_context([]),
+                            summary=memory.summary
+                        )
+                        with result.stage("answer"):
+                            answer = ChatEngine.generate_answer(gpt_model, messages, result, on_token)
+                        if not answer:
+                            answer = f"Error in function call: {str(e)}. Falling back to LLM knowledge."
+                else:
+                    try:
+                        answer = first_llm_response.choices[0].message.content
+                    except Exception as e:
+                        log.warning("Error in direct response: %s", e)
+                        answer = "Error: Failed to process direct response. Please try again."
+            result.answer = answer or ""
+            if generate:
+                memory.add_turn(user_input, result.answer)
+        log.info("turn trace=%s %s", result.trace_id,
+                 " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in result.timings.items()))
+        return result
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import asyncio
+import threading
+import uuid
+from utils.app_utils import APPCFG, MEMORIES, model_map
+from utils.chat_engine import ChatEngine, TurnResult
+from utils.conversation_memory import ConversationMemory, Turn
+from utils.telemetry import METRICS, get_logger
+
+log = get_logger("chat_service")
+
+
+class Overloaded(Exception):
+    """
+    Raised when a turn is refused because the service is at its limit of admitted turns.
+    """
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Too many turns in progress, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SessionBusy(Exception):
+    """
+    Raised when a session already has a turn in progress.
+    """
+
+
+class UnknownModel(ValueError):
+    """
+    Raised for a model that is not one of the service's `models`.
+    """
+
+
+class SessionNotFound(KeyError):
+    """
+    Raised for a session id the conversation store does not know.
+    """
+
+
+class ChatService:
+    """
+    Runs chat turns for many sessions concurrently, independent of any UI or transport.
+
+    Session state lives in the shared conversation store, so any worker process using the same
+    store can serve any session. Turns run on a bounded thread pool: up to `max_concurrent_turns`
+    at once and `max_queued_turns` waiting; beyond that new turns are refused with `Overloaded`
+    instead of queueing without bound. A session runs one turn at a time across all processes:
+    the turn claims the session in the store for at most `session_lease` seconds.
+    """
+    def __init__(self, max_concurrent_turns: int = 8, max_queued_turns: int = 32, retry_after: float = 2.0,
+                 default_model: Optional[str] = None, session_lease: float = 300.0) -> None:
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_queued_turns = max_queued_turns
+        self.retry_after = retry_after
+        self.session_lease = session_lease
+        self.default_model = default_model or APPCFG.gpt_model
+        # The models the app offers and has a prompt budget for
+        self.models = {self.default_model, *model_map.values(), *APPCFG.prompt_budget.get("models", {})}
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_turns, thread_name_prefix="chat-turn")
+        self.stats = {"turns": 0, "rejected": 0, "busy": 0, "failed": 0}
+        self._admitted = 0
+        self._lock = threading.Lock()
+        METRICS.register_stats("chat_service", lambda: self.stats)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ChatService":
+        """
+        Build the service from the `server` section of the app config.
+        """
+        config = config or {}
+        keys = ("max_concurrent_turns", "max_queued_turns", "retry_after", "default_model", "session_lease")
+        return cls(**{k: config[k] for k in keys if k in config})
+
+    @property
+    def in_flight(self) -> int:
+        return self._admitted
+
+    @property
+    def capacity(self) -> int:
+        return self.max_concurrent_turns + self.max_queued_turns
+
+    def create_session(self) -> str:
+        memory = MEMORIES.create(uuid.uuid4().hex)
+        memory.save()
+        return memory.session_id
+
+    def load_session(self, session_id: str) -> ConversationMemory:
+        memory = MEMORIES.load(session_id)
+        if memory is None:
+            raise SessionNotFound(session_id)
+        return memory
+
+    def history(self, session_id: str, pages: int = 1) -> List[Turn]:
+        return self.load_session(session_id).page(pages)
+
+    def delete_session(self, session_id: str) -> None:
+        self.load_session(session_id).clear()
+
+    def start_turn(self, session_id: str, message: str, model: Optional[str] = None,
+                   on_token: Optional[Callable[[str], None]] = None) -> "asyncio.Future[TurnResult]":
+        """
+        Admit a turn and start it on the turn pool. Raises `UnknownModel`, `Overloaded`,
+        `SessionBusy` or `SessionNotFound` right away, before anything has been sent to the client.
+        `on_token` is called from the worker thread with the answer text so far.
+        """
+        if model is not None and (not isinstance(model, str) or model not in self.models):
+            raise UnknownModel(model)
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self.stats["rejected"] += 1
+                raise Overloaded(self.retry_after)
+            self._admitted += 1
+        owner = uuid.uuid4().hex
+        try:
+            if not MEMORIES.store.claim(session_id, owner, self.session_lease):
+                if MEMORIES.store.load_state(session_id) is None:
+                    raise SessionNotFound(session_id)
+                with self._lock:
+                    self.stats["busy"] += 1
+                raise SessionBusy(session_id)
+        except BaseException:
+            with self._lock:
+                self._admitted -= 1
+            raise
+        try:
+            memory = self.load_session(session_id)
+        except BaseException:
+            self._release(session_id, owner)
+            raise
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, ChatEngine.run_turn, memory, message, model or self.default_model, on_token
+        )
+        future.add_done_callback(lambda f: self._finish(session_id, owner, f))
+        return future
+
+    def _release(self, session_id: str, owner: str) -> None:
+        MEMORIES.store.release(session_id, owner)
+        with self._lock:
+            self._admitted -= 1
+
+    def _finish(self, session_id: str, owner: str, future: "asyncio.Future[TurnResult]") -> None:
+        self._release(session_id, owner)
+        if future.cancelled() or future.exception() is not None:
+            self.stats["failed"] += 1
+            if not future.cancelled():
+                log.warning("Turn failed for session %s: %s", session_id, future.exception())
+        else:
+            self.stats["turns"] += 1
+
+    async def run_turn(self, session_id: str, message: str, model: Optional[str] = None,
+                       on_token: Optional[Callable[[str], None]] = None) -> TurnResult:
+        return await self.start_turn(session_id, message, model, on_token)
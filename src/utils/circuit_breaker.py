@@ -0,0 +1,148 @@
+from typing import Dict, Optional, Tuple
+import threading
+import time
+from utils.telemetry import get_logger
+
+log = get_logger("circuit_breaker")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling a backend whose circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend. After `failure_threshold` consecutive failures the breaker
+    opens and calls are refused right away; after `reset_timeout` seconds it lets one trial call
+    through (half-open), which closes it again on success or reopens it on failure.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = CLOSED
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the backend now. In the half-open state only one trial call is let through.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            if self._trial_running:
+                return False
+            self._state = HALF_OPEN
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                log.info("Circuit %s closed", self.name)
+            self._state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def release(self) -> None:
+        """
+        End a call that neither succeeded nor failed at the backend (e.g. it never got a request slot).
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed call. Returns True if this failure opened the breaker.
+        """
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self._state != OPEN
+                self._state = OPEN
+                self.opened_at = time.monotonic()
+                if opened:
+                    log.warning("Circuit %s opened after %d failures; retrying in %.0fs",
+                                self.name, self.failures, self.reset_timeout)
+                return opened
+            return False
+
+
+class CircuitBreakers:
+    """
+    One `CircuitBreaker` per backend and method, e.g. ("duckduckgo", "search_news").
+    """
+    def __init__(self, enabled: bool = True, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "CircuitBreakers":
+        """
+        Build the breakers from the `circuit_breaker` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def get(self, backend: str, method: str) -> CircuitBreaker:
+        key = (backend, method)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    key, CircuitBreaker(f"{backend}/{method}", self.failure_threshold, self.reset_timeout))
+        return breaker
+
+    def allow(self, backend: str, method: str) -> bool:
+        if not self.enabled or self.get(backend, method).allow():
+            return True
+        with self._lock:
+            self.stats["rejected"] += 1
+        return False
+
+    def record(self, backend: str, method: str, ok: Optional[bool]) -> None:
+        """
+        Record the outcome of a call let through by `allow`; None for a call that never reached the backend.
+        """
+        if not self.enabled:
+            return
+        breaker = self.get(backend, method)
+        if ok is None:
+            breaker.release()
+        elif ok:
+            breaker.record_success()
+        elif breaker.record_failure():
+            with self._lock:
+                self.stats["opened"] += 1
+
+    def is_open(self, backend: str, method: str) -> bool:
+        """
+        Whether calls to `backend` for `method` are currently refused (half-open counts as not open).
+        """
+        if not self.enabled:
+            return False
+        breaker = self._breakers.get((backend, method))
+        return breaker is not None and breaker.state == OPEN
+
+    def states(self) -> Dict[str, str]:
+        return {breaker.name: breaker.state for breaker in list(self._breakers.values())}
@@ -0,0 +1,235 @@
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pyprojroot import here
+
+Turn = Tuple[int, str, str]
+
+
+class ConversationStore:
+    """
+    SQLite store for the full turn log of every session, so that old turns can leave memory
+    and still be paged back into the UI, and for the state of each session's memory, so that
+    any process sharing the file can pick a session up. A session can be claimed for one turn at
+    a time across all those processes (`claim`).
+    """
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        if db_path and not os.path.isabs(db_path):
+            db_path = str(here(db_path))
+        if db_path and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns (session_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "question TEXT NOT NULL, answer TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (session_id, idx))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, total_turns INTEGER NOT NULL, "
+            "recent_from INTEGER NOT NULL, summary TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "busy_owner TEXT, busy_until REAL NOT NULL DEFAULT 0)"
+        )
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, idx: int, question: str, answer: str) -> None:
+        """
+        Add turn `idx` of a session. Raises `sqlite3.IntegrityError` if another process already
+        wrote a turn with that index, rather than overwriting it.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO turns (session_id, idx, question, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, idx, question, answer, time.time())
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def load(self, session_id: str, start: int, stop: int) -> List[Turn]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT idx, question, answer FROM turns WHERE session_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (session_id, start, stop)
+            ).fetchall()
+
+    def save_state(self, session_id: str, total_turns: int, recent_from: int, summary_lines: List[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, total_turns, recent_from, summary, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET total_turns = excluded.total_turns, "
+                "recent_from = excluded.recent_from, summary = excluded.summary, updated_at = excluded.updated_at",
+                (session_id, total_turns, recent_from, json.dumps(summary_lines), time.time())
+            )
+
+    def claim(self, session_id: str, owner: str, lease: float) -> bool:
+        """
+        Mark a session as running a turn of `owner` for at most `lease` seconds. Returns False if
+        the session is unknown or another owner's lease has not run out yet.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE sessions SET busy_owner = ?, busy_until = ? "
+                "WHERE session_id = ? AND (busy_owner IS NULL OR busy_until <= ?)",
+                (owner, now + lease, session_id, now)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, session_id: str, owner: str) -> None:
+        """
+        End the claim of `owner` on a session; a claim taken over after its lease ran out is left alone.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET busy_owner = NULL, busy_until = 0 WHERE session_id = ? AND busy_owner = ?",
+                (session_id, owner)
+            )
+
+    def load_state(self, session_id: str) -> Optional[Tuple[int, int, List[str]]]:
+        """
+        Return the total turn count, the index of the first verbatim turn and the summary lines
+        of a session, or None if the session is unknown.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT total_turns, recent_from, summary FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def extractive_summary(question: str, answer: str, max_chars: int = 240) -> str:
+    """
+    Summarize a turn locally as its question plus the first sentence of the answer.
+    """
+    first_sentence = re.split(r"(?<=[.!?])\s", answer.strip(), maxsplit=1)[0]
+    line = f"- Asked: {question.strip()} | Answered: {first_sentence}"
+    return line if len(line) <= max_chars else line[:max_chars - 1] + "…"
+
+
+class ConversationMemory:
+    """
+    Bounded memory of one chat session.
+
+    The last `window` turns are kept verbatim (and fewer if they exceed `max_chars`); older turns
+    are folded into a rolling summary capped at `summary_max_chars`, oldest lines dropping first.
+    Every turn is also written to the `ConversationStore`, which serves older pages to the UI.
+    """
+    def __init__(self, session_id: str, store: ConversationStore, window: int = 6, max_chars: int = 20000,
+                 summary_max_chars: int = 2000, page_size: int = 10,
+                 summarizer: Callable[[str, str], str] = extractive_summary) -> None:
+        self.session_id = session_id
+        self.store = store
+        self.window = window
+        self.max_chars = max_chars
+        self.summary_max_chars = summary_max_chars
+        self.page_size = page_size
+        self.summarizer = summarizer
+        self.recent: Deque[Turn] = deque()
+        self.summary_lines: Deque[str] = deque()
+        self.total_turns = 0
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def _recent_chars(self) -> int:
+        return sum(len(q) + len(a) for _, q, a in self.recent)
+
+    def _fold_oldest(self) -> None:
+        _, question, answer = self.recent.popleft()
+        self.summary_lines.append(self.summarizer(question, answer))
+        while self.summary_lines and len(self.summary) > self.summary_max_chars:
+            self.summary_lines.popleft()
+
+    def add_turn(self, question: str, answer: str) -> None:
+        idx = self.total_turns
+        self.store.append(self.session_id, idx, question, answer)
+        self.total_turns += 1
+        self.recent.append((idx, question, answer))
+        while len(self.recent) > self.window or (len(self.recent) > 1 and self._recent_chars() > self.max_chars):
+            self._fold_oldest()
+        self.save()
+
+    def save(self) -> None:
+        """
+        Write the memory's state to the store; the turns themselves are written by `add_turn`.
+        """
+        recent_from = self.recent[0][0] if self.recent else self.total_turns
+        self.store.save_state(self.session_id, self.total_turns, recent_from, list(self.summary_lines))
+
+    def restore(self) -> bool:
+        """
+        Reload the memory's state and verbatim turns from the store. Returns False if the store
+        does not know the session.
+        """
+        state = self.store.load_state(self.session_id)
+        if state is None:
+            return False
+        self.total_turns, recent_from, summary_lines = state
+        self.summary_lines = deque(summary_lines)
+        self.recent = deque(self.store.load(self.session_id, recent_from, self.total_turns))
+        return True
+
+    def history_entries(self) -> List[str]:
+        """
+        The verbatim recent turns, oldest first, formatted for the prompt.
+        """
+        return [f"User query: {q}\nResponse: {a}" for _, q, a in self.recent]
+
+    def page(self, pages: int = 1) -> List[Turn]:
+        """
+        The last `pages` pages of turns for display, oldest first. Turns still held in memory
+        are not re-read from the store.
+        """
+        start = max(0, self.total_turns - pages * self.page_size)
+        in_memory_from = self.recent[0][0] if self.recent else self.total_turns
+        older = self.store.load(self.session_id, start, in_memory_from) if start < in_memory_from else []
+        return older + [turn for turn in self.recent if turn[0] >= start]
+
+    def clear(self) -> None:
+        self.store.delete(self.session_id)
+        self.recent.clear()
+        self.summary_lines.clear()
+        self.total_turns = 0
+
+
+class ConversationMemoryFactory:
+    """
+    Creates per-session memories that share one `ConversationStore`.
+    """
+    def __init__(self, db_path: Optional[str] = None, **memory_kwargs) -> None:
+        self.store = ConversationStore(db_path)
+        self.memory_kwargs = memory_kwargs
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ConversationMemoryFactory":
+        """
+        Build the factory from the `conversation_memory` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def create(self, session_id: str) -> ConversationMemory:
+        return ConversationMemory(session_id, self.store, **self.memory_kwargs)
+
+    def load(self, session_id: str) -> Optional[ConversationMemory]:
+        """
+        Return the memory of a stored session, or None if there is no such session.
+        """
+        memory = self.create(session_id)
+        return memory if memory.restore() else None
@@ -0,0 +1,228 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+import threading
+import time
+from utils.telemetry import METRICS, get_logger, percentile
+
+log = get_logger("hedging")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("search_deadline", default=None)
+_route: ContextVar[Dict] = ContextVar("search_route", default={})
+
+
+class SearchSkipped(Exception):
+    """
+    Raised instead of results when a search never got an answer from a backend: the turn's
+    search budget ran out, its circuit was open or it never got a request slot. Unlike an empty
+    answer, this says nothing about the query and must not be cached.
+    """
+
+
+@contextmanager
+def search_budget(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Give every search started inside the block (in this context, its tasks and its worker
+    threads) until `seconds` from now. A budget already in place is only ever shortened.
+    Yields the absolute deadline (a `time.monotonic()` value), or None without a budget.
+    """
+    deadline = _deadline.get()
+    if seconds is not None:
+        ends = time.monotonic() + seconds
+        deadline = ends if deadline is None else min(deadline, ends)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_budget() -> Optional[float]:
+    """
+    Seconds left of the current search budget (never negative), or None without a budget.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def current_route() -> Dict:
+    """
+    The DDGS client settings (e.g. `proxy`) of the attempt running in this context.
+    """
+    return _route.get()
+
+
+class Hedger:
+    """
+    Hedged search requests under a deadline.
+
+    The primary attempt runs on the default route. If it has not answered after the
+    `percentile`-th latency of recent calls of the same method, a duplicate is sent over the next
+    alternate route (e.g. a proxy) and whichever returns results first wins. When the search
+    budget runs out, `SearchSkipped` is raised and the turn continues with what the other
+    searches returned; attempts still running finish in the background and hand their results
+    to `on_late`, so later turns can use them. An empty answer is final and never hedged.
+    At most `max_hedge_ratio` of all calls are hedged, so hedging cannot double the load on a
+    struggling backend.
+    """
+    def __init__(self, enabled: bool = True, budget: Optional[float] = 8.0, percentile: float = 90,
+                 min_delay: float = 0.5, initial_delay: float = 2.0, min_samples: int = 20, window: int = 200,
+                 max_hedge_ratio: float = 0.2, routes: Optional[List[Dict]] = None, max_workers: int = 16) -> None:
+        self.enabled = enabled
+        self.budget = budget
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.max_hedge_ratio = max_hedge_ratio
+        self.routes = [dict(route) for route in routes or []]
+        self.max_workers = max_workers
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "deadline_expired": 0, "late_results": 0}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "Hedger":
+        """
+        Build a hedger from the `hedging` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def observe(self, method: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(method)
+            if samples is None:
+                samples = self._latencies[method] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, method: str) -> float:
+        """
+        How long the primary attempt of `method` may take before a hedge is sent.
+        """
+        with self._lock:
+            samples = list(self._latencies.get(method, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, percentile(samples, self.percentile))
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return self.stats["hedged"] < self.max_hedge_ratio * self.stats["calls"]
+
+    def _submit(self, method: str, route: Dict, func: Callable, args, kwargs) -> Future:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+        context = copy_context()
+
+        def attempt():
+            _route.set(route)
+            start = time.monotonic()
+            results = func(*args, **kwargs)
+            # Primary latencies are recorded even when a hedge won, so slow calls count too
+            if not route and results:
+                self.observe(method, time.monotonic() - start)
+            return results
+
+        return self._executor.submit(context.run, attempt)
+
+    def _keep_late(self, method: str, attempts: Iterable[Future], on_late: Optional[Callable[[List], None]]) -> None:
+        """
+        Hand the results of attempts abandoned at the deadline to `on_late` once they arrive.
+        """
+        if on_late is None:
+            return
+
+        def done(future: Future) -> None:
+            if future.cancelled() or future.exception() is not None or not future.result():
+                return
+            self._count("late_results")
+            log.debug("%s answered after the search deadline; keeping its results", method)
+            try:
+                on_late(future.result())
+            except Exception as e:
+                log.warning("Could not keep the late results of %s: %s", method, e)
+
+        for future in attempts:
+            future.add_done_callback(done)
+
+    def call(self, method: str, func: Callable[..., List], *args,
+             on_late: Optional[Callable[[List], None]] = None, **kwargs) -> List:
+        """
+        Run the search `func(*args, **kwargs)` with hedging, within the current search budget.
+        Raises `SearchSkipped` when no route answered before the deadline; results that arrive
+        later are passed to `on_late`.
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        deadline = current_deadline()
+        if deadline is not None and deadline <= time.monotonic():
+            self._count("deadline_expired")
+            raise SearchSkipped("search budget exhausted")
+        self._count("calls")
+        attempts: Dict[Future, Optional[Dict]] = {self._submit(method, {}, func, args, kwargs): None}
+        routes = iter(self.routes)
+        hedge_at = time.monotonic() + self.hedge_delay(method) if self.routes else None
+        # Whether some route reached its backend, which then answered empty or failed
+        reached = False
+        while attempts or hedge_at is not None:
+            wakeups = [t for t in (deadline, hedge_at) if t is not None]
+            timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+            done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED) if attempts else (set(), set())
+            for future in done:
+                route = attempts.pop(future)
+                try:
+                    results = future.result()
+                except SearchSkipped as e:
+                    log.debug("%s skipped over %s: %s", method, route or "the default route", e)
+                    continue
+                except Exception as e:
+                    reached = True
+                    log.warning("%s failed over %s: %s", method, route or "the default route", e)
+                    continue
+                reached = True
+                if not results:
+                    # An empty answer is final; only hedges already running may still find results
+                    hedge_at = None
+                    continue
+                if route is not None:
+                    self._count("hedge_wins")
+                    log.debug("%s answered by the hedge over %s", method, route)
+                return results
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                self._count("deadline_expired")
+                METRICS.inc("search_deadline_expired_total", help="Searches dropped at the turn's search deadline",
+                            method=method)
+                log.warning("%s gave up at the search deadline; continuing without its results", method)
+                self._keep_late(method, attempts, on_late)
+                if reached:
+                    return []
+                raise SearchSkipped("search deadline reached")
+            # Hedge once the primary is slower than usual, or right away when it was skipped or failed
+            if hedge_at is not None and (now >= hedge_at or not attempts):
+                route = next(routes, None)
+                hedge_at = now + self.hedge_delay(method) if route is not None else None
+                if route is not None and self._may_hedge():
+                    self._count("hedged")
+                    METRICS.inc("search_hedged_total", help="Searches duplicated over an alternate route",
+                                method=method)
+                    log.debug("%s still running after %.2fs, hedging over %s", method,
+                              self.hedge_delay(method), route)
+                    attempts[self._submit(method, route, func, args, kwargs)] = route
+        if not reached:
+            raise SearchSkipped("no route could be tried")
+        return []
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional, Pattern, Tuple
+import re
+import threading
+from utils.telemetry import get_logger
+
+log = get_logger("intent_router")
+
+
+class IntentRouter:
+    """
+    A rule-based router that maps obvious search requests (e.g. "latest news on X",
+    "video tutorial for Y") straight to a search tool, skipping the function-calling LLM.
+
+    Each rule has a weight; the confidence of a route is the best tool's score minus the
+    runner-up's, so ambiguous inputs fall back to the LLM. A single word like "news" or "watch"
+    is only a hint (at most `HINT_WEIGHT`) and never routes on its own; it takes a phrase like
+    "latest news on", "videos of" or "find a pdf". Follow-up questions that refer to
+    earlier turns ("tell me more about it") also fall back, since they need the chat history.
+    """
+    RULES: Dict[str, List[Tuple[str, float]]] = {
+        "search_news": [
+            (r"\b(latest|breaking|recent|today'?s|current)\b(?P<gap>.{0,40})\bnews\b", 0.9),
+            (r"\bnews\s+(on|about|for|from|regarding)\b", 0.85),
+            (r"\b(latest|breaking|top|today'?s|current)\s+headlines?\b", 0.85),
+            (r"\bheadlines?\s+(on|about|for|from|regarding)\b", 0.85),
+            (r"\b(news|headlines?)\b", 0.3),
+        ],
+        "search_video": [
+            (r"\b(video|videos)\s+(tutorials?|guides?|courses?|lectures?)\b", 0.9),
+            (r"\b(tutorials?|lectures?|talks?)\s+videos?\b", 0.9),
+            (r"\b(videos?|clips?|footage)\s+(of|about|on|showing|explaining)\b", 0.85),
+            (r"\b(videos?|tutorials?|clips?|talks?|lectures?)\s+(on|from)\s+(youtube|vimeo)\b", 0.85),
+            (r"\bsearch\s+(on\s+)?(youtube|vimeo)\s+for\b", 0.85),
+            (r"\b(show|find|search|get)\s+(me\s+)?(a\s+|some\s+)?videos?\b", 0.8),
+            (r"(^|\b(to|i|me|let's|lets|please)\s+)watch\s+(a\s+|the\s+|some\s+)?videos?\b", 0.8),
+            (r"\b(videos?|watch|youtube|vimeo)\b", 0.3),
+        ],
+        "search_pdf": [
+            (r"\b(find|search(\s+for)?|look\s+up)\s+(me\s+)?(a\s+|an\s+|the\s+|some\s+)?pdfs?\b", 0.85),
+            (r"\bpdfs?\s+(of|about|on|for)\b", 0.85),
+            (r"\b(white\s?papers?|research papers?|datasheets?)\s+(on|about|for|of)\b", 0.7),
+            (r"\b(pdfs?|white\s?papers?|research papers?|datasheets?)\b", 0.3),
+        ],
+        "search_image": [
+            (r"\b(images?|pictures?|photos?)\s+(of|showing)\b", 0.85),
+        ],
+        "search_map": [
+            (r"\b(near me|nearby|directions to|address of)\b", 0.85),
+            (r"\b(restaurants?|cafes?|hotels?|shops?|stores?|pharmac(y|ies))\s+in\s+\w+", 0.75),
+        ],
+    }
+    KEYWORD_ARG = {
+        "search_news": "keywords",
+        "search_video": "keywords",
+        "search_image": "keywords",
+        "search_pdf": "query",
+        "search_map": "query",
+    }
+    FOLLOW_UP = re.compile(
+        r"\b(it|its|that|this|those|these|them|they|he|she|previous|above|earlier|more about)\b", re.I
+    )
+    HINT_WEIGHT = 0.5
+    STOPWORDS = {
+        "a", "an", "the", "on", "about", "for", "from", "regarding", "of", "to", "in", "me", "my",
+        "please", "can", "could", "you", "i", "want", "need", "find", "show", "give", "get", "search",
+        "look", "up", "some", "any", "what", "whats", "what's", "is", "are", "there", "on", "with", "and",
+    }
+    # Left out of the keywords only where a rule matched them as its trigger, so "Apple Watch"
+    # keeps its "Watch"; a rule's `gap` group (the topic between two triggers) is never left out
+    TRIGGER_WORDS = {
+        "latest", "breaking", "recent", "today", "todays", "today's", "current", "news", "headline",
+        "headlines", "video", "videos", "clip", "clips", "footage", "watch", "youtube", "vimeo", "pdf",
+        "pdfs", "image", "images", "picture", "pictures", "photo", "photos", "showing",
+    }
+
+    def __init__(self, enabled: bool = True, min_confidence: float = 0.6) -> None:
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.rules: Dict[str, List[Tuple[Pattern, float]]] = {
+            tool: [(re.compile(pattern, re.I), weight) for pattern, weight in rules]
+            for tool, rules in self.RULES.items()
+        }
+        self.stats = {"routed": 0, "fallback": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "IntentRouter":
+        """
+        Build a router from the `intent_router` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    @property
+    def bypass_rate(self) -> float:
+        """
+        Share of routed turns that skipped the function-calling LLM.
+        """
+        total = self.stats["routed"] + self.stats["fallback"]
+        return self.stats["routed"] / total if total else 0.0
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        Score every tool against the text; a tool's score is its best matching rule weight plus
+        a small bonus per additional match.
+        """
+        scores = {}
+        for tool, rules in self.rules.items():
+            weights = sorted((w for pattern, w in rules if pattern.search(text)), reverse=True)
+            if weights:
+                scores[tool] = min(1.0, weights[0] + 0.05 * (len(weights) - 1))
+        return scores
+
+    @classmethod
+    def trigger_spans(cls, text: str, tool: Optional[str] = None) -> List[Tuple[int, int]]:
+        """
+        The spans of the text matched by the rules (of `tool`, or of every tool) above `HINT_WEIGHT`,
+        less their `gap` groups.
+        """
+        spans = []
+        for name, rules in cls.RULES.items():
+            if tool not in (None, name):
+                continue
+            for pattern, weight in rules:
+                if weight <= cls.HINT_WEIGHT:
+                    continue
+                for match in re.finditer(pattern, text, re.I):
+                    if match.groupdict().get("gap") is None:
+                        spans.append(match.span())
+                    else:
+                        spans += [(match.start(), match.start("gap")), (match.end("gap"), match.end())]
+        return spans
+
+    @classmethod
+    def extract_keywords(cls, text: str, tool: Optional[str] = None) -> str:
+        """
+        The search keywords of the text: stopwords are dropped, and trigger words where a rule
+        (of `tool`, or of every tool) matched them.
+        """
+        spans = cls.trigger_spans(text, tool)
+        words = []
+        for match in re.finditer(r"[\w'.+#-]+", text):
+            word = match.group().lower()
+            if word in cls.STOPWORDS:
+                continue
+            if word in cls.TRIGGER_WORDS and any(start <= match.start() and match.end() <= end for start, end in spans):
+                continue
+            words.append(match.group())
+        return " ".join(words).strip(" .")
+
+    def classify(self, text: str) -> Tuple[Optional[Dict], float]:
+        """
+        Return the tool call the text maps to (or None) and the router's confidence in it.
+        """
+        scores = self.score(text)
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        tool, best = ranked[0]
+        confidence = best - (ranked[1][1] if len(ranked) > 1 else 0.0)
+        if self.FOLLOW_UP.search(text):
+            confidence *= 0.5
+        keywords = self.extract_keywords(text, tool)
+        if not keywords:
+            return None, 0.0
+        args = {self.KEYWORD_ARG[tool]: keywords}
+        if tool == "search_map":
+            place = re.search(r"\bin\s+([A-Z][\w-]*(?:\s+[A-Z][\w-]*)*)\s*\??$", text.strip())
+            if place:
+                args["place"] = place.group(1)
+                args["query"] = keywords.replace(place.group(1), "").strip() or keywords
+        return {"id": None, "name": tool, "args": args, "error": None}, confidence
+
+    def route(self, text: str) -> Optional[Dict]:
+        """
+        Return a tool call when the router is confident enough to skip the function-calling LLM,
+        otherwise None.
+        """
+        if not self.enabled:
+            return None
+        call, confidence = self.classify(text)
+        routed = call is not None and confidence >= self.min_confidence
+        with self._lock:
+            self.stats["routed" if routed else "fallback"] += 1
+        if routed:
+            log.debug("Intent router: %s(%s) confidence=%.2f, bypass rate %.0f%%", call["name"], call["args"],
+                      confidence, self.bypass_rate * 100)
+            return call
+        return None
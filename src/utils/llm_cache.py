@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+from pyprojroot import here
+from utils.cache import TieredCache
+from utils.resources import lazy_import
+
+chat_types = lazy_import("openai.types.chat")
+
+
+class LLMCache(TieredCache):
+    """
+    Cache for OpenAI ChatCompletion responses, keyed by a hash of model, temperature, tools
+    and messages. Only calls at or below `max_temperature` are cached, since only those are
+    (close to) deterministic. TTLs are set per call kind (`function_caller`, `chatbot`).
+    """
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_temperature: float = 0.0, **kwargs) -> None:
+        super().__init__(table="llm_responses", dumps=lambda r: r.model_dump_json(),
+                         loads=lambda data: chat_types.ChatCompletion.model_validate_json(data), **kwargs)
+        self.ttls = ttls or {}
+        self.max_temperature = max_temperature
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["LLMCache"]:
+        """
+        Build a cache from the `llm_cache` section of the app config.
+        Returns None when caching is disabled.
+        """
+        config = dict(config or {})
+        if not config.pop("enabled", True):
+            return None
+        db_path = config.pop("db_path", None)
+        if db_path and not os.path.isabs(db_path):
+            db_path = str(here(db_path))
+        return cls(db_path=db_path, **config)
+
+    def cacheable(self, temperature: float) -> bool:
+        return temperature is not None and temperature <= self.max_temperature
+
+    @staticmethod
+    def make_key(kind: str, model: str, temperature: float, messages: List[Dict],
+                 tools: Optional[List[Dict]] = None) -> str:
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "messages": messages, "tools": tools},
+            sort_keys=True, separators=(",", ":"), default=str
+        )
+        return f"{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def ttl_for(self, kind: str) -> float:
+        return self.ttls.get(kind, self.default_ttl)
+
+    @staticmethod
+    def completion_from_text(model: str, text: str) -> "chat_types.ChatCompletion":
+        """
+        Build a ChatCompletion holding `text`, used to cache answers that were streamed.
+        """
+        return chat_types.ChatCompletion.model_validate({
+            "id": "cached-stream", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+        })
@@ -15,11 +15,30 @@ class LoadConfig:
 
         self.gpt_model = config['gpt_model']
         self.temperature = config['temperature']
+        self.streaming = config.get('streaming', False)
         self.llm_system_role = config['llm_system_role']
         self.llm_function_caller_system_role = config['llm_function_caller_system_role']
+        self.search_cache = config.get('search_cache', {})
+        self.session_pool = config.get('session_pool', {})
+        self.tool_calls = config.get('tool_calls', {})
+        self.rate_limit = config.get('rate_limit', {})
+        self.intent_router = config.get('intent_router', {})
+        self.query_planner = config.get('query_planner', {})
+        self.speculative_search = config.get('speculative_search', {})
+        self.result_processing = config.get('result_processing', {})
+        self.prompt_budget = config.get('prompt_budget', {})
+        self.conversation_memory = config.get('conversation_memory', {})
+        self.page_fetcher = config.get('page_fetcher', {})
+        self.local_index = config.get('local_index', {})
+        self.llm_cache = config.get('llm_cache', {})
+        self.telemetry = config.get('telemetry', {})
+        self.hedging = config.get('hedging', {})
+        self.circuit_breaker = config.get('circuit_breaker', {})
+        self.server = config.get('server') or {}
+        self.batch = config.get('batch') or {}
         
         # Charger la clé API depuis le fichier YAML
-        self.api_key = config['openai']['api_key']
+        self.api_key = config['openai']['api_key'] or os.getenv("OPENAI_API_KEY")
         self.api_version = config['openai']['api_version']
 
         # Charger la clé API dans la configuration d'OpenAI
@@ -27,10 +46,9 @@ class LoadConfig:
     
     def load_openai_credentials(self):
         """
-        Loads OpenAI API credentials and sets them in the OpenAI library.
+        Checks the OpenAI API key and exports it for the OpenAI clients. The openai package itself
+        is only imported when the first client is created.
         """
-        import openai
-        openai.api_key = self.api_key
-        openai.api_version = self.api_version
-        if openai.api_key is None:
+        if self.api_key is None:
             raise ValueError("OpenAI API key not found in the config.")
+        os.environ.setdefault("OPENAI_API_KEY", self.api_key)
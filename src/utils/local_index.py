@@ -0,0 +1,194 @@
+from typing import Dict, List, Optional
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pyprojroot import here
+from utils.search_result import SearchResult
+
+# Tools whose results are interchangeable share one collection in the index.
+COLLECTIONS = {
+    "retrieve_results": "text",
+    "search_text": "text",
+    "user_proxy_for_text_web_search": "text",
+    "search_pdf": "pdf",
+    "search_news": "news",
+    "search_video": "video",
+    "search_image": "image",
+}
+# Stored as JSON next to the indexed text; empty fields are left out
+EXTRA_FIELDS = ("source", "duration", "uploader")
+
+
+class LocalIndex:
+    """
+    On-disk full-text index (SQLite FTS5, ranked with BM25) of every search result and fetched
+    page excerpt, updated incrementally as searches come back.
+
+    Searches consult it first: when enough results indexed within the tool's freshness window
+    match all query terms, they are served without touching the search backend. In `index_only`
+    mode the backend is never called.
+    """
+    DEFAULT_FRESHNESS = {"news": 30 * 60, "text": 24 * 60 * 60, "video": 7 * 24 * 60 * 60,
+                         "image": 7 * 24 * 60 * 60, "pdf": 30 * 24 * 60 * 60}
+
+    def __init__(self, enabled: bool = True, db_path: Optional[str] = None, index_only: bool = False,
+                 min_results: int = 3, freshness: Optional[Dict[str, float]] = None,
+                 max_documents: int = 50000) -> None:
+        self.enabled = enabled
+        self.index_only = index_only
+        self.min_results = min_results
+        self.max_documents = max_documents
+        self.freshness = dict(self.DEFAULT_FRESHNESS)
+        for tool, seconds in (freshness or {}).items():
+            self.freshness[COLLECTIONS.get(tool, tool)] = seconds
+        self.stats = {"hits": 0, "misses": 0, "indexed": 0}
+        self._since_prune = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if enabled:
+            if db_path and os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._create_tables()
+
+    def _create_tables(self) -> None:
+        """
+        Results are rows of a regular table, unique per collection and URL, and matched through
+        an external-content FTS5 table kept in sync by triggers.
+        """
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY, collection TEXT NOT NULL, url TEXT NOT NULL, title TEXT NOT NULL,
+                description TEXT NOT NULL, excerpt TEXT NOT NULL, extra TEXT NOT NULL, indexed_at REAL NOT NULL,
+                UNIQUE (collection, url)
+            );
+            CREATE INDEX IF NOT EXISTS results_indexed_at ON results (indexed_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+                title, description, excerpt, content='results', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+                INSERT INTO results_fts (rowid, title, description, excerpt)
+                VALUES (new.id, new.title, new.description, new.excerpt);
+            END;
+            CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+                INSERT INTO results_fts (results_fts, rowid, title, description, excerpt)
+                VALUES ('delete', old.id, old.title, old.description, old.excerpt);
+            END;
+            CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE ON results BEGIN
+                INSERT INTO results_fts (results_fts, rowid, title, description, excerpt)
+                VALUES ('delete', old.id, old.title, old.description, old.excerpt);
+                INSERT INTO results_fts (rowid, title, description, excerpt)
+                VALUES (new.id, new.title, new.description, new.excerpt);
+            END;
+        """)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "LocalIndex":
+        """
+        Build the index from the `local_index` section of the app config.
+        """
+        config = dict(config or {})
+        db_path = config.pop("db_path", None)
+        if db_path and not os.path.isabs(db_path):
+            db_path = str(here(db_path))
+        return cls(db_path=db_path, **config)
+
+    def handles(self, tool: str) -> bool:
+        return self._db is not None and tool in COLLECTIONS
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        terms = re.findall(r"\w+", str(query).lower())
+        return " AND ".join(f'"{t}"' for t in terms)
+
+    def add(self, tool: str, results: List[SearchResult]) -> None:
+        """
+        Insert or refresh results of a tool. An existing excerpt is kept when the new result has none.
+        """
+        if not self.handles(tool):
+            return
+        collection = COLLECTIONS[tool]
+        now = time.time()
+        rows = [
+            (collection, r.url, r.title, r.description, r.excerpt or "",
+             json.dumps({k: getattr(r, k) for k in EXTRA_FIELDS if getattr(r, k)}), now)
+            for r in results if r.url
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO results (collection, url, title, description, excerpt, extra, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (collection, url) DO UPDATE SET title = excluded.title, "
+                    "description = excluded.description, "
+                    "excerpt = CASE WHEN excluded.excerpt != '' THEN excluded.excerpt ELSE results.excerpt END, "
+                    "extra = excluded.extra, indexed_at = excluded.indexed_at",
+                    rows
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self.stats["indexed"] += len(rows)
+            self._since_prune += len(rows)
+            if self._since_prune >= 500:
+                self._prune()
+                self._since_prune = 0
+
+    def add_tool_results(self, tool_results: List[Dict]) -> None:
+        for call in tool_results:
+            self.add(call.get("name", ""), call.get("result") or [])
+
+    def _prune(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_documents:
+            self._db.execute(
+                "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY indexed_at LIMIT ?)",
+                (count - self.max_documents,)
+            )
+
+    def search(self, tool: str, query: str, max_results: Optional[int] = 5) -> List[SearchResult]:
+        """
+        Return up to `max_results` fresh indexed results of the tool's collection matching every
+        term of the query, best BM25 score first.
+        """
+        expression = self.match_expression(query)
+        if not self.handles(tool) or not expression:
+            return []
+        collection = COLLECTIONS[tool]
+        oldest = time.time() - self.freshness.get(collection, self.DEFAULT_FRESHNESS["text"])
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT r.url, r.title, r.description, r.excerpt, r.extra "
+                "FROM results_fts JOIN results r ON r.id = results_fts.rowid "
+                "WHERE results_fts MATCH ? AND r.collection = ? AND r.indexed_at >= ? "
+                "ORDER BY bm25(results_fts, 10.0, 5.0, 1.0) LIMIT ?",
+                (expression, collection, oldest, max_results or 5)
+            ).fetchall()
+        results = []
+        for url, title, description, excerpt, extra in rows:
+            fields = {k: v for k, v in json.loads(extra).items() if k in EXTRA_FIELDS}
+            results.append(SearchResult(url, title, description, excerpt=excerpt or "", **fields))
+        return results
+
+    def lookup(self, tool: str, query: str, max_results: Optional[int] = 5) -> Optional[List[SearchResult]]:
+        """
+        Return indexed results that can stand in for a live search, or None if the backend
+        should be queried. In `index_only` mode whatever the index has is returned.
+        """
+        if not self.handles(tool):
+            return None
+        results = self.search(tool, query, max_results)
+        wanted = min(self.min_results, max_results or self.min_results)
+        if self.index_only or len(results) >= wanted:
+            self.stats["hits"] += 1
+            return results
+        self.stats["misses"] += 1
+        return None
@@ -0,0 +1,206 @@
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import httpx
+import openai
+from duckduckgo_search.exceptions import DuckDuckGoSearchException, RatelimitException
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+WORDS = (
+    "market report update analysis model energy policy research launch review team city climate "
+    "data release study global local season price court health vote space chip network battery"
+).split()
+
+
+class BackendProfile:
+    """
+    Behaviour of a local stand-in backend: a log-normal latency around `latency` seconds,
+    and the share of calls that fail or are throttled.
+    """
+    def __init__(self, latency: float = 0.05, jitter: float = 0.3, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, token_latency: float = 0.0, answer_tokens: int = 60,
+                 direct_answer_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.direct_answer_rate = direct_answer_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "BackendProfile":
+        return cls(**(config or {}))
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            return self.latency * self._random.lognormvariate(0, self.jitter) if self.jitter else self.latency
+
+    def outcome(self) -> str:
+        """
+        Draw the outcome of one call: "ok", "error" or "rate_limited".
+        """
+        draw = self.random()
+        with self._lock:
+            self.stats["calls"] += 1
+            if draw < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return "rate_limited"
+            if draw < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+        return "ok"
+
+
+def fake_results(query: str, max_results: Optional[int] = 5) -> List[Dict]:
+    """
+    Deterministic DDGS-shaped results for a query, with every field any `WebSearch` method reads.
+    """
+    seed = int(hashlib.md5(query.encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    terms = query.split()
+    suffix = ".pdf" if "pdf" in query.lower() else ""
+    results = []
+    for i in range(max_results or 5):
+        words = " ".join(rng.sample(WORDS, 6))
+        slug = f"{seed % 997}-{i}"
+        url = f"https://example{i % 4}.org/{'-'.join(terms[:3])}/{slug}{suffix}"
+        results.append({
+            "title": f"{' '.join(terms[:4])} {words.split()[0]}".strip(),
+            "href": url,
+            "url": url,
+            "body": f"{query} {words}.",
+            "description": f"{query} {words}.",
+            "source": f"example{i % 4}.org",
+            "image": f"https://img.example.org/{slug}.jpg",
+            "content": f"https://www.youtube.com/watch?v={slug}",
+            "duration": f"{rng.randint(1, 20)}:{rng.randint(10, 59)}",
+            "uploader": f"channel{i % 3}",
+            "text": f"{query} {words}",
+            "address": f"{i + 1} Main Street",
+        })
+    return results
+
+
+class FakeDDGS:
+    """
+    Stand-in for `duckduckgo_search.DDGS` with the latency and failure behaviour of a `BackendProfile`.
+    """
+    def __init__(self, profile: BackendProfile, **kwargs) -> None:
+        self.profile = profile
+
+    def _search(self, query: str, max_results: Optional[int] = 5, **kwargs) -> List[Dict]:
+        time.sleep(self.profile.sample_latency())
+        outcome = self.profile.outcome()
+        if outcome == "rate_limited":
+            raise RatelimitException("Ratelimit: 202 (offline profile)")
+        if outcome == "error":
+            raise DuckDuckGoSearchException("Search failed (offline profile)")
+        return fake_results(query, max_results)
+
+    text = news = videos = images = maps = _search
+
+    def answers(self, query: str) -> List[Dict]:
+        return self._search(query, 1)
+
+    def suggestions(self, query: str) -> List[Dict]:
+        return self._search(query, 5)
+
+
+class FakeChatCompletions:
+    QUESTION_MARKER = "# User new question:\n"
+    TOOL_HINTS = (("news", "search_news"), ("video", "search_video"), ("pdf", "search_pdf"),
+                  ("image", "search_image"), ("picture", "search_image"))
+
+    def __init__(self, profile: BackendProfile) -> None:
+        self.profile = profile
+
+    def _question(self, messages: List[Dict]) -> str:
+        content = str(messages[-1].get("content", ""))
+        question = content.split(self.QUESTION_MARKER, 1)[-1]
+        return question.split("\n\n# Web search results", 1)[0].strip()
+
+    def _tool_call(self, question: str, tools: List[Dict]) -> Dict:
+        names = {t["function"]["name"]: t["function"] for t in tools}
+        name = next((tool for hint, tool in self.TOOL_HINTS if hint in question.lower() and tool in names), None)
+        name = name or ("search_text" if "search_text" in names else next(iter(names)))
+        parameters = names[name].get("parameters", {})
+        required = parameters.get("required") or list(parameters.get("properties", {}))
+        args = {required[0]: question} if required else {}
+        return {"id": f"call_{hashlib.md5(question.encode()).hexdigest()[:8]}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)}}
+
+    def _answer(self, question: str, messages: List[Dict]) -> str:
+        content = str(messages[-1].get("content", ""))
+        links = [part.split("]", 1)[0] for part in content.split("[Link: ")[1:]]
+        words = [WORDS[i % len(WORDS)] for i in range(self.profile.answer_tokens)]
+        answer = f"About {question}: {' '.join(words)}."
+        return f"{answer} [Link: {links[0]}]" if links else answer
+
+    def _raise(self, outcome: str) -> None:
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        if outcome == "rate_limited":
+            raise openai.RateLimitError("Rate limit reached (offline profile)",
+                                        response=httpx.Response(429, request=request), body=None)
+        if outcome == "error":
+            raise openai.APIConnectionError(request=request)
+
+    async def create(self, model: str, messages: List[Dict], temperature: float = 0, tools: Optional[List] = None,
+                     stream: bool = False, **kwargs):
+        await asyncio.sleep(self.profile.sample_latency())
+        self._raise(self.profile.outcome())
+        question = self._question(messages)
+        message = {"role": "assistant", "content": None}
+        if tools and self.profile.random() >= self.profile.direct_answer_rate:
+            message["tool_calls"] = [self._tool_call(question, tools)]
+        else:
+            message["content"] = self._answer(question, messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        if stream:
+            usage = prompt_tokens if (kwargs.get("stream_options") or {}).get("include_usage") else None
+            return self._stream(model, message["content"] or "", usage)
+        return ChatCompletion.model_validate({
+            "id": "offline", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens,
+                      "completion_tokens": self.profile.answer_tokens,
+                      "total_tokens": self.profile.answer_tokens},
+        })
+
+    async def _stream(self, model: str, text: str, prompt_tokens: Optional[int] = None):
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.profile.token_latency:
+                await asyncio.sleep(self.profile.token_latency)
+            yield ChatCompletionChunk.model_validate({
+                "id": "offline", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}}],
+            })
+        if prompt_tokens is not None:
+            yield ChatCompletionChunk.model_validate({
+                "id": "offline", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [], "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                                         "total_tokens": prompt_tokens + len(words)},
+            })
+
+
+class FakeAsyncOpenAI:
+    """
+    Stand-in for `openai.AsyncOpenAI` covering `chat.completions.create`, with and without
+    tools and streaming.
+    """
+    def __init__(self, profile: BackendProfile) -> None:
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(profile))
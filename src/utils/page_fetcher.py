@@ -0,0 +1,328 @@
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+import asyncio
+import io
+import ipaddress
+import os
+import re
+import socket
+import time
+import weakref
+from pyprojroot import here
+from utils.cache import TieredCache
+from utils.resources import lazy_import
+from utils.result_processing import bm25_scores
+from utils.telemetry import get_logger
+
+httpx = lazy_import("httpx")
+pypdf = lazy_import("pypdf")
+log = get_logger("page_fetcher")
+
+
+class BlockedURL(ValueError):
+    """
+    Raised for a URL the fetcher refuses to connect to: not http(s), or a host that resolves to
+    a loopback, private, link-local or other non-public address.
+    """
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"}
+    BLOCK = {"p", "div", "section", "article", "li", "br", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "pre"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+
+def extract_html_text(html: str) -> str:
+    """
+    Extract the readable text of an HTML page, leaving out scripts, styles and page chrome.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).split("\n"))
+    return "\n".join(line for line in lines if len(line) > 1)
+
+
+def extract_pdf_text(data: bytes, max_pages: int = 20) -> str:
+    """
+    Extract the text of the first `max_pages` pages of a PDF.
+    """
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    pages = [page.extract_text() or "" for page in reader.pages[:max_pages]]
+    return "\n".join(" ".join(p.split()) for p in pages if p.strip())
+
+
+def chunk_text(text: str, chunk_chars: int = 800, overlap: int = 100) -> List[str]:
+    """
+    Split text into chunks of about `chunk_chars` characters, preferring sentence boundaries.
+    """
+    sentences = re.split(r"(?<=[.!?])\s+|\n+", text)
+    chunks: List[str] = []
+    current = ""
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) + 1 > chunk_chars:
+            chunks.append(current)
+            current = current[-overlap:].split(" ", 1)[-1] if overlap else ""
+        current = f"{current} {sentence}".strip()
+        while len(current) > chunk_chars:
+            chunks.append(current[:chunk_chars])
+            current = current[chunk_chars - overlap:]
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class PageFetcher:
+    """
+    Optional deep-read stage: fetches the top result pages concurrently and attaches the most
+    query-relevant chunks of their text to the results as `excerpt`.
+
+    Fetches share one HTTP connection pool per event loop, are limited per host, and must all
+    finish before the per-turn `deadline`; pages still loading by then are dropped. Extracted text
+    is cached, and stale entries are revalidated with ETag / Last-Modified.
+
+    Result URLs come from the web, so the fetcher follows redirects itself and checks every host
+    before connecting: hosts that resolve to a loopback, private or link-local address are refused
+    unless `allow_private_addresses` is set.
+    """
+    def __init__(self, enabled: bool = False, top_n: int = 3, deadline: float = 4.0, request_timeout: float = 3.0,
+                 max_connections: int = 10, per_host_limit: int = 2, max_bytes: int = 2_000_000,
+                 max_pdf_bytes: int = 10_000_000, max_redirects: int = 5, allow_private_addresses: bool = False,
+                 chunk_chars: int = 800, chunks_per_page: int = 2, cache_entries: int = 256,
+                 cache_db_path: Optional[str] = None, fresh_for: float = 600, cache_ttl: float = 86400,
+                 verify: bool = True, user_agent: str = "Mozilla/5.0 (compatible; RealtimeWebSearch/1.0)") -> None:
+        self.enabled = enabled
+        self.top_n = top_n
+        self.deadline = deadline
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.max_bytes = max_bytes
+        self.max_pdf_bytes = max_pdf_bytes
+        self.max_redirects = max_redirects
+        self.allow_private_addresses = allow_private_addresses
+        self.chunk_chars = chunk_chars
+        self.chunks_per_page = chunks_per_page
+        self.fresh_for = fresh_for
+        self.cache_ttl = cache_ttl
+        self.verify = verify
+        self.user_agent = user_agent
+        self.cache = TieredCache(max_entries=cache_entries, db_path=cache_db_path, default_ttl=cache_ttl,
+                                 table="pages")
+        self.stats = {"fetched": 0, "cached": 0, "revalidated": 0, "failed": 0, "timed_out": 0, "too_large": 0}
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._host_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "PageFetcher":
+        """
+        Build a fetcher from the `page_fetcher` section of the app config.
+        """
+        config = dict(config or {})
+        db_path = config.pop("cache_db_path", None)
+        if db_path and not os.path.isabs(db_path):
+            db_path = str(here(db_path))
+        return cls(cache_db_path=db_path, **config)
+
+    def _client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.request_timeout,
+                follow_redirects=False,
+                verify=self.verify,
+                headers={"User-Agent": self.user_agent},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._clients[loop] = client
+        return client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        limits = self._host_limits.setdefault(asyncio.get_running_loop(), {})
+        host = urlsplit(url).netloc.lower()
+        if host not in limits:
+            limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limits[host]
+
+    async def _check_host(self, url: str) -> None:
+        """
+        Raise `BlockedURL` unless the URL is http(s) and its host resolves to public addresses only.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise BlockedURL(f"Not an http(s) URL: {url}")
+        if self.allow_private_addresses:
+            return
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        for *_, sockaddr in infos:
+            address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+            if getattr(address, "ipv4_mapped", None):
+                address = address.ipv4_mapped
+            if not address.is_global or address.is_multicast:
+                raise BlockedURL(f"{parts.hostname} resolves to the non-public address {address}")
+
+    @asynccontextmanager
+    async def _get(self, url: str, headers: Dict[str, str]) -> AsyncIterator["httpx.Response"]:
+        """
+        Stream a GET of the URL, following up to `max_redirects` redirects and checking each host
+        before connecting to it.
+        """
+        for _ in range(self.max_redirects + 1):
+            await self._check_host(url)
+            async with self._client().stream("GET", url, headers=headers) as response:
+                if not response.has_redirect_location:
+                    yield response
+                    return
+                url = str(response.url.join(response.headers["location"]))
+        raise httpx.TooManyRedirects(f"More than {self.max_redirects} redirects", request=response.request)
+
+    @staticmethod
+    def _is_pdf(url: str, content_type: str) -> bool:
+        return "pdf" in content_type or url.lower().split("?")[0].endswith(".pdf")
+
+    def _extract(self, url: str, content_type: str, data: bytes, encoding: Optional[str]) -> str:
+        if self._is_pdf(url, content_type):
+            return extract_pdf_text(data)
+        if "html" in content_type or "xml" in content_type or not content_type:
+            return extract_html_text(data.decode(encoding or "utf-8", errors="replace"))
+        if content_type.startswith("text/"):
+            return data.decode(encoding or "utf-8", errors="replace")
+        return ""
+
+    async def fetch_text(self, url: str) -> str:
+        """
+        Return the extracted text of a page, from the cache when fresh and revalidating it when stale.
+        """
+        cached = self.cache.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.fresh_for:
+            self.stats["cached"] += 1
+            return cached["text"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._host_limit(url):
+            async with self._get(url, headers) as response:
+                if response.status_code == 304 and cached:
+                    self.stats["revalidated"] += 1
+                    cached["fetched_at"] = time.time()
+                    self.cache.set(url, cached, ttl=self.cache_ttl)
+                    return cached["text"]
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "").lower()
+                is_pdf = self._is_pdf(url, content_type)
+                limit = self.max_pdf_bytes if is_pdf else self.max_bytes
+                data, truncated = bytearray(), False
+                async for block in response.aiter_bytes():
+                    room = limit - len(data)
+                    data.extend(block[:room])
+                    if len(block) > room:
+                        truncated = True
+                        break
+                entry = {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                    "fetched_at": time.time(),
+                }
+                encoding = response.charset_encoding
+
+        if truncated and is_pdf:
+            # A PDF cut off at the limit cannot be parsed: its cross-reference table is at the end
+            self.stats["too_large"] += 1
+            log.debug("Skipping %s: PDF larger than %d bytes", url, limit)
+            return ""
+        entry["text"] = await asyncio.to_thread(self._extract, url, content_type, bytes(data), encoding)
+        self.stats["fetched"] += 1
+        if entry["text"]:
+            self.cache.set(url, entry, ttl=self.cache_ttl)
+        return entry["text"]
+
+    def best_chunks(self, text: str, query: str) -> List[str]:
+        chunks = chunk_text(text, self.chunk_chars)
+        if len(chunks) <= self.chunks_per_page:
+            return chunks
+        scores = bm25_scores(query, chunks)
+        best = sorted(range(len(chunks)), key=lambda i: -scores[i])[:self.chunks_per_page]
+        return [chunks[i] for i in sorted(best)]
+
+    async def fetch_many(self, urls: List[str], query: str, deadline: Optional[float] = None) -> Dict[str, List[str]]:
+        """
+        Fetch pages concurrently and return the best chunks of each page that finished before the
+        deadline (seconds from now).
+        """
+        deadline = self.deadline if deadline is None else deadline
+
+        async def read(url: str) -> List[str]:
+            return self.best_chunks(await self.fetch_text(url), query)
+
+        tasks = {asyncio.ensure_future(read(url)): url for url in dict.fromkeys(urls)}
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+            self.stats["timed_out"] += 1
+        pages = {}
+        for task in done:
+            if task.exception() is not None:
+                self.stats["failed"] += 1
+                log.warning("Error fetching %s: %s", tasks[task], task.exception())
+            elif task.result():
+                pages[tasks[task]] = task.result()
+        return pages
+
+    async def enrich(self, tool_results: List[Dict], query: str) -> List[Dict]:
+        """
+        Attach an `excerpt` to the top `top_n` results (in prompt order) that have a URL.
+        """
+        if not self.enabled:
+            return tool_results
+        urls = [r.url for call in tool_results for r in call.get("result") or [] if r.url][:self.top_n]
+        pages = await self.fetch_many(urls, query)
+        return [
+            dict(call, result=[
+                r.replace(excerpt=" … ".join(pages[r.url])) if r.url in pages else r
+                for r in call.get("result") or []
+            ])
+            for call in tool_results
+        ]
@@ -0,0 +1,154 @@
+from typing import Dict, List, Optional, Tuple
+import functools
+import math
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed and its encoding is available offline,
+    otherwise estimates them as one token per four characters.
+    """
+    CHARS_PER_TOKEN = 4
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def encoding(model: str):
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except Exception:
+            try:
+                return tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                return None
+
+    @classmethod
+    def count(cls, text: str, model: str) -> int:
+        if not text:
+            return 0
+        encoding = cls.encoding(model)
+        if encoding is None:
+            return math.ceil(len(text) / cls.CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    @classmethod
+    def truncate(cls, text: str, max_tokens: int, model: str) -> str:
+        """
+        Cut `text` down to at most `max_tokens` tokens, marking the cut with an ellipsis.
+        """
+        if max_tokens <= 0:
+            return ""
+        if cls.count(text, model) <= max_tokens:
+            return text
+        encoding = cls.encoding(model)
+        if encoding is None:
+            return text[:max(0, max_tokens * cls.CHARS_PER_TOKEN - 1)] + "…"
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens - 1]) + "…"
+
+
+class PromptAssembler:
+    """
+    Builds the chat messages for the function-calling and answer LLM calls within a per-model
+    prompt token budget.
+
+    The system role and the user question are always kept (the question is truncated only if it
+    alone exceeds the budget). The remaining tokens are split between the search context and the
+    chat history by `search_share`; whatever one of them leaves unused goes to the other.
+    History keeps the most recent turns first, then the summary of older turns; search context
+    keeps its top-ranked lines first.
+    """
+    HISTORY_HEADER = "# Chat history:\n"
+    QUESTION_HEADER = "# User new question:\n "
+    SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+    def __init__(self, models: Optional[Dict[str, int]] = None, default_max_prompt_tokens: int = 3000,
+                 search_share: float = 0.6, history_turns: Optional[int] = None, max_question_share: float = 0.5) -> None:
+        self.models = models or {}
+        self.default_max_prompt_tokens = default_max_prompt_tokens
+        self.search_share = search_share
+        self.history_turns = history_turns
+        self.max_question_share = max_question_share
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "PromptAssembler":
+        """
+        Build an assembler from the `prompt_budget` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def budget(self, model: str) -> int:
+        return self.models.get(model, self.default_max_prompt_tokens)
+
+    def _fit_history(self, history: List[str], summary: str, max_tokens: int, model: str) -> str:
+        kept: List[str] = []
+        used = 0
+        for entry in reversed(history[-self.history_turns:] if self.history_turns else history):
+            entry = str(entry)
+            cost = TokenCounter.count(entry, model) + 1
+            if used + cost > max_tokens:
+                if not kept:
+                    kept.append(TokenCounter.truncate(entry, max_tokens - used - 1, model))
+                    used = max_tokens
+                break
+            kept.append(entry)
+            used += cost
+        if summary and used < max_tokens:
+            kept.append(TokenCounter.truncate(f"{self.SUMMARY_HEADER}{summary}", max_tokens - used - 1, model))
+        return "\n".join(reversed([k for k in kept if k]))
+
+    def _fit_search(self, search_context: str, max_tokens: int, model: str) -> str:
+        lines = search_context.split("\n")
+        kept: List[str] = []
+        used = 0
+        for line in lines:
+            cost = TokenCounter.count(line, model) + 1
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(kept).rstrip()
+
+    def assemble(self, model: str, system_role: str, question: str, history: List[str],
+                 search_context: str = "", summary: str = "") -> Tuple[List[Dict], Dict[str, int]]:
+        """
+        Return the messages for one LLM call and the token count of each part.
+        The conversation `summary` has the lowest priority and only uses history tokens the
+        recent turns leave over.
+        """
+        budget = self.budget(model)
+        system_role = str(system_role)
+        question = TokenCounter.truncate(question, int(budget * self.max_question_share), model)
+        fixed = (TokenCounter.count(system_role, model) + TokenCounter.count(self.HISTORY_HEADER, model)
+                 + TokenCounter.count(self.QUESTION_HEADER + question, model))
+        remaining = max(0, budget - fixed)
+
+        search_budget = 0
+        if search_context:
+            search_budget = min(int(remaining * self.search_share), TokenCounter.count(search_context, model))
+        history_budget = remaining - search_budget
+        history_text = self._fit_history(history, summary, history_budget, model)
+        history_tokens = TokenCounter.count(history_text, model)
+        search_text = ""
+        if search_context:
+            search_text = self._fit_search(search_context, remaining - history_tokens, model)
+
+        content = f"{self.HISTORY_HEADER}{history_text}\n\n{self.QUESTION_HEADER}{question}{search_text}"
+        messages = [
+            {"role": "system", "content": system_role},
+            {"role": "user", "content": content}
+        ]
+        counts = {
+            "system": TokenCounter.count(system_role, model),
+            "history": history_tokens,
+            "question": TokenCounter.count(question, model),
+            "search": TokenCounter.count(search_text, model),
+        }
+        counts["total"] = counts["system"] + TokenCounter.count(content, model)
+        counts["budget"] = budget
+        return messages, counts
@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional, Tuple
+import re
+import threading
+from utils.intent_router import IntentRouter
+from utils.telemetry import get_logger
+
+log = get_logger("query_planner")
+
+
+class QueryPlanner:
+    """
+    Splits a question with several parts ("what is X and how does it compare to Y?") into
+    focused sub-queries and plans one search per sub-query, without asking the function-calling
+    LLM. A part about recent events also gets a news search, and a part about research or
+    specifications a PDF search, each over the sub-query of that part.
+
+    The planned tool calls run concurrently like any other tool calls (under the shared rate
+    limit and search budget), and their results are fused with reciprocal rank fusion before
+    the answer call (see `ResultProcessor`). Questions with a single part, and input where some
+    part is neither a question nor a search request, are left to the intent router and the
+    function-calling LLM.
+    """
+    CLAUSES = re.compile(
+        r"[?;\n]+|\.\s+|\b(?:as well as|and also|along with)\b|"
+        r",?\s+(?:and|but)\s+(?=(?:how|what|why|when|where|which|who|whether|is|are|does|do|can|should)\b)",
+        re.I
+    )
+    COMPARISON = re.compile(r"\s+(?:vs\.?|versus|compared (?:to|with))\s+", re.I)
+    RECENT = re.compile(
+        r"\b(latest|recent|recently|current|today|this (?:week|month|year)|news|updates?|announced|released?|20\d\d)\b",
+        re.I
+    )
+    RESEARCH = re.compile(
+        r"\b(papers?|research|study|studies|specifications?|spec|standards?|white\s?papers?|reports?|survey|benchmarks?)\b",
+        re.I
+    )
+    # Left out of sub-queries on top of the intent router's stopwords
+    QUESTION_WORDS = {
+        "how", "why", "when", "where", "which", "who", "whether", "does", "do", "did", "will", "would",
+        "should", "be", "it", "its", "they", "them", "their", "this", "that", "these", "those", "one",
+        "ones", "else", "other", "others",
+    }
+    # A clause with one of these is about the topic of the first clause ("... and how does it work?"),
+    # and so is an elliptical follow-up without a topic of its own ("... and which ones are cheapest?")
+    REFERS_BACK = re.compile(r"\b(it|its|they|them|their|this|that|these|those)\b", re.I)
+    ELLIPTICAL = re.compile(
+        r"^\s*(?:and\s+)?(?:which ones?|what else|any others?|how come|since when)\b", re.I
+    )
+    # Clauses that are a question even without a question mark
+    QUESTION = re.compile(
+        r"^\s*(?:how|what|why|when|where|which|who|whether|is|are|was|were|does|do|did|can|could|should|will|would)\b",
+        re.I
+    )
+    # Statements that ask for a search; phrases the intent router routes on count as well
+    SEARCH = re.compile(
+        r"^\s*(?:please\s+)?(?:find|search(?: the web)?(?: for)?|look (?:up|for)|show me|get me|list)\b", re.I
+    )
+    # Greetings and thanks, and requests about the conversation or the answer itself ("rewrite your
+    # answer", "translate this", "make it rhyme"): these need no search and are left out of the plan
+    SMALL_TALK = re.compile(
+        r"^\s*(?:hi|hello|hey|thanks?|thank you|thx|ok(?:ay)?|great|cool|sure|perfect|good (?:morning|afternoon|evening))\b"
+        r"[\w\s,!.']{0,20}$",
+        re.I
+    )
+    CONVERSATIONAL = re.compile(
+        r"^\s*(?:(?:can|could|would|will) you\s+|please\s+)?(?:re-?write|rephrase|reword|translate|summari[sz]e|shorten|"
+        r"expand|simplify|repeat|continue|write|compose|draft|make (?:it|this|that)|keep (?:it|this|that))\b|"
+        r"\byour (?:answer|response|reply|last message)\b",
+        re.I
+    )
+    # Questions that build on earlier turns need the chat history, which only the LLM sees
+    FOLLOW_UP = re.compile(
+        r"\b(previous|above|earlier|more about|you (?:said|mentioned))\b|^\s*(?:and|also|what about|how about)\b", re.I
+    )
+
+    def __init__(self, enabled: bool = True, max_subqueries: int = 4, max_results: int = 5) -> None:
+        self.enabled = enabled
+        self.max_subqueries = max_subqueries
+        self.max_results = max_results
+        self.stats = {"planned": 0, "subqueries": 0, "single": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "QueryPlanner":
+        """
+        Build a planner from the `query_planner` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def keywords(self, text: str) -> str:
+        return " ".join(w for w in IntentRouter.extract_keywords(text).split() if w.lower() not in self.QUESTION_WORDS)
+
+    def clauses(self, text: str) -> List[Tuple[str, bool]]:
+        """
+        The non-empty clauses of the text, each with whether it ended in a question mark.
+        """
+        clauses, start = [], 0
+        for match in self.CLAUSES.finditer(text):
+            clauses.append((text[start:match.start()], "?" in match.group()))
+            start = match.end()
+        clauses.append((text[start:], False))
+        return [(clause, asked) for clause, asked in clauses if clause.strip()]
+
+    def searchable(self, clause: str, asked: bool, keywords: str) -> bool:
+        """
+        Whether a clause looks like something to search for: a question, or a statement that asks
+        for a search ("find ...", "latest news on ..."). Greetings, thanks, instructions and
+        requests about the conversation are not.
+        """
+        if not keywords or self.SMALL_TALK.search(clause) or self.CONVERSATIONAL.search(clause):
+            return False
+        return (asked or bool(self.QUESTION.search(clause)) or bool(self.SEARCH.search(clause))
+                or bool(IntentRouter.trigger_spans(clause)))
+
+    def parts(self, text: str) -> List[Tuple[str, str]]:
+        """
+        The clauses of the text, each with its keyword sub-query, or an empty list when any clause
+        is not searchable. Clauses that refer back ("how does it work") or are elliptical ("which
+        ones are cheapest") are prefixed with the first sub-query.
+        """
+        parts: List[Tuple[str, str]] = []
+        for clause, asked in self.clauses(text):
+            keywords = self.keywords(clause)
+            if not self.searchable(clause, asked, keywords):
+                return []
+            if parts and (self.REFERS_BACK.search(clause) or self.ELLIPTICAL.search(clause)):
+                keywords = f"{parts[0][1]} {keywords}".strip()
+            parts.append((clause, keywords))
+        return parts
+
+    def decompose(self, text: str) -> List[str]:
+        """
+        The distinct keyword sub-queries of the text: one per clause, and for a comparison
+        ("X vs Y") also one per side.
+        """
+        subqueries: List[str] = []
+        for clause, keywords in self.parts(text):
+            candidates = [keywords]
+            sides = self.COMPARISON.split(clause)
+            if len(sides) > 1:
+                candidates += [self.keywords(side) for side in sides]
+            for query in candidates:
+                if query and query.lower() not in map(str.lower, subqueries):
+                    subqueries.append(query)
+        return subqueries
+
+    def plan(self, text: str) -> List[Dict]:
+        """
+        Return the tool calls for a question with several parts, or an empty list when the
+        question should take the usual path.
+        """
+        if not self.enabled or self.FOLLOW_UP.search(text):
+            return []
+        subqueries = self.decompose(text)
+        if len(subqueries) < 2:
+            with self._lock:
+                self.stats["single"] += 1
+            return []
+        extra = []
+        parts = self.parts(text)
+        recent = next((keywords for clause, keywords in parts if self.RECENT.search(clause)), None)
+        if recent:
+            extra.append(("search_news", "keywords", recent))
+        research = next((keywords for clause, keywords in parts if self.RESEARCH.search(clause)), None)
+        if research:
+            extra.append(("search_pdf", "query", research))
+        planned = [("search_text", "query", q) for q in subqueries][:max(1, self.max_subqueries - len(extra))]
+        calls = [
+            {"id": None, "name": name, "args": {arg: query, "max_results": self.max_results}, "error": None,
+             "planned": True}
+            for name, arg, query in (planned + extra)[:self.max_subqueries]
+        ]
+        with self._lock:
+            self.stats["planned"] += 1
+            self.stats["subqueries"] += len(calls)
+        log.debug("Query planner: %s", [(call["name"], call["args"]) for call in calls])
+        return calls
@@ -0,0 +1,117 @@
+from typing import Callable, Dict, Optional, TypeVar
+import random
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a call could not be completed within the retry budget or deadline because
+    the backend kept throttling it.
+    """
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return type(error).__name__ == "RatelimitException" or "Ratelimit" in str(error)
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: `rate` tokens per second, holding at most `capacity`.
+    """
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for it until `deadline` (a `time.monotonic()` value).
+        Returns False if no token became available in time.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for `seconds`, e.g. after the backend signalled throttling.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for calls to rate-limited search backends.
+
+    Calls draw from a shared token bucket. Throttled calls are retried with exponential backoff
+    and full jitter, up to `max_retries` times and never past the per-request `deadline`.
+    """
+    def __init__(self, rate: float = 1.0, burst: float = 5, max_retries: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 20.0, deadline: float = 45.0) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "gave_up": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "RateLimiter":
+        """
+        Build a limiter from the `rate_limit` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func: Callable[..., T], *args, deadline: Optional[float] = None, **kwargs) -> T:
+        """
+        Call `func` under the rate limit. `deadline` is an absolute `time.monotonic()` value and
+        defaults to now plus the configured per-request deadline.
+        Raises `RateLimitExceeded` when throttling outlasts the retry budget or the deadline.
+        """
+        deadline = time.monotonic() + self.deadline if deadline is None else deadline
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(deadline):
+                self._count("gave_up")
+                raise RateLimitExceeded("deadline reached while waiting for a request slot")
+            self._count("calls")
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self._count("throttled")
+                delay = self.backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                    self._count("gave_up")
+                    raise RateLimitExceeded(f"still throttled after {attempt + 1} attempts") from e
+                self.bucket.pause(delay)
+                self._count("retries")
+                attempt += 1
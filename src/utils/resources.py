@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import functools
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from utils.telemetry import METRICS, get_logger
+
+log = get_logger("resources")
+
+
+class StartupTimer:
+    """
+    Where the start-up time of the process went: module imports, deferred imports and the shared
+    resources, in the order they were first built. Each step is also exported as
+    `startup_seconds_total{step}`.
+    """
+    def __init__(self) -> None:
+        self.steps: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def record(self, step: str, seconds: float) -> None:
+        with self._lock:
+            self.steps.append((step, seconds))
+        METRICS.inc("startup_seconds_total", seconds, help="Time spent loading modules and shared resources",
+                    step=step)
+        log.debug("startup %s took %.1f ms", step, seconds * 1000)
+
+    @contextmanager
+    def timed(self, step: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step, time.perf_counter() - start)
+
+    def report(self) -> str:
+        with self._lock:
+            steps = list(self.steps)
+        return ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in steps)
+
+
+STARTUP = StartupTimer()
+
+
+class LazyModule(ModuleType):
+    """
+    Stands in for a module until one of its attributes is first used, then imports it.
+    """
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        with self.__dict__["_lock"]:
+            module = self.__dict__.get("_module")
+            if module is None:
+                with STARTUP.timed(f"import {self.__name__}"):
+                    module = importlib.import_module(self.__name__)
+                self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+
+_lazy_modules: Dict[str, LazyModule] = {}
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a heavy module on first use instead of at start-up. Modules that are already loaded
+    are returned as they are.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _lazy_modules.setdefault(name, LazyModule(name))
+
+
+def resource(func: Callable) -> Callable:
+    """
+    Build a shared resource once per process (per distinct arguments) and reuse it afterwards,
+    across Streamlit reruns, sessions and worker threads. Build times go into `STARTUP`.
+    """
+    built: Dict[Tuple, Any] = {}
+    lock = threading.RLock()
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if args in built:
+            return built[args]
+        with lock:
+            if args not in built:
+                with STARTUP.timed(func.__name__ if not args else f"{func.__name__}{args!r}"):
+                    built[args] = func(*args)
+        return built[args]
+
+    return wrapper
+
+
+@resource
+def config():
+    """
+    The parsed app config.
+    """
+    from utils.load_config import LoadConfig
+    return LoadConfig()
+
+
+@resource
+def image(path: str):
+    """
+    An image asset, decoded once.
+    """
+    from pyprojroot import here
+    from PIL import Image
+    with Image.open(here(path)) as file:
+        file.load()
+        return file.copy()
+
+
+def warm() -> None:
+    """
+    Load what the first turn would otherwise wait for: the OpenAI and DuckDuckGo clients and the
+    tool schemas. Used by the long-running services once they are up.
+    """
+    import utils.app_utils as app_utils
+    import utils.web_search as web_search
+    for module in (app_utils.openai, web_search.duckduckgo_search):
+        if isinstance(module, LazyModule):
+            module._load()
+    app_utils.Apputils.wrap_functions()
+
+
+def import_times(module: str, limit: int = 20) -> List[Tuple[str, float, float]]:
+    """
+    Cold-import `module` in a fresh interpreter (`python -X importtime`) and return the `limit`
+    slowest imports as (name, own seconds, cumulative seconds).
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        if own.isdigit():
+            rows.append((name, int(own) / 1e6, int(cumulative) / 1e6))
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
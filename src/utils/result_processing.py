@@ -0,0 +1,142 @@
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import math
+import re
+from utils.search_result import SearchResult
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "ref", "ref_src",
+    "ref_url", "referrer", "feature", "si", "spm", "_ga", "_gl", "cmpid", "ocid", "smid",
+}
+MIRROR_PREFIXES = ("www.", "m.", "mobile.", "amp.", "old.")
+TOKEN = re.compile(r"\w+")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce a URL to a canonical form: lower-case scheme and host, no mirror prefixes
+    (www., m., amp., ...), no tracking parameters, no fragment and no trailing slash.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.hostname or ""
+    for prefix in MIRROR_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    path = parts.path
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    if host == "youtu.be" and path.strip("/"):
+        host, query, path = "youtube.com", [("v", path.strip("/"))] + query, "/watch"
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = path.rstrip("/") if path != "/" else ""
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme.lower()
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(str(text).lower())
+
+
+def bm25_scores(query: str, documents: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """
+    Score each document against the query with Okapi BM25, using the documents themselves
+    as the corpus for document frequencies.
+    """
+    terms = set(tokenize(query))
+    docs = [tokenize(d) for d in documents]
+    if not terms or not docs:
+        return [0.0] * len(documents)
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    df = Counter(t for d in docs for t in set(d) if t in terms)
+    n = len(docs)
+    scores = []
+    for doc in docs:
+        tf = Counter(t for t in doc if t in terms)
+        score = 0.0
+        for term, freq in tf.items():
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * freq * (k1 + 1) / (freq + k1 * (1 - b + b * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """
+    Fuse several rankings (best first) with reciprocal rank fusion: an item scores the sum of
+    1 / (k + rank) over the rankings it appears in, so items found by several searches rise.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(dict.fromkeys(ranking), 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class ResultProcessor:
+    """
+    Post-processing between `WebSearch` and prompt assembly: drops results whose canonical URL
+    was already seen in any tool call, re-ranks the rest against the user query with BM25 over
+    title and description, and keeps the best `top_k` results within `max_chars`.
+
+    The results of the sub-queries of a planned turn (see `QueryPlanner`) are ranked with
+    reciprocal rank fusion instead, over the ranking of each sub-query and the BM25 ranking.
+    """
+    def __init__(self, enabled: bool = True, top_k: int = 8, max_chars: int = 4000, rrf_k: int = 60) -> None:
+        self.enabled = enabled
+        self.top_k = top_k
+        self.max_chars = max_chars
+        self.rrf_k = rrf_k
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ResultProcessor":
+        """
+        Build a processor from the `result_processing` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    def process(self, tool_results: List[Dict], query: str) -> List[Dict]:
+        """
+        Return copies of the tool call results with only the selected results, each list ordered
+        by relevance. Tool calls keep their original order.
+        """
+        if not self.enabled:
+            return tool_results
+        seen = set()
+        candidates = []
+        for i, call in enumerate(tool_results):
+            for r in call.get("result") or []:
+                key = canonicalize_url(r.url) if r.url else None
+                if key is not None and key in seen:
+                    continue
+                if key is not None:
+                    seen.add(key)
+                candidates.append((i, r, key))
+
+        scores = bm25_scores(
+            query, [f"{r.title} {r.description}" for _, r, _ in candidates]
+        )
+        if any(call.get("planned") for call in tool_results):
+            rankings = [[canonicalize_url(r.url) for r in call.get("result") or [] if r.url] for call in tool_results]
+            by_bm25 = sorted(range(len(candidates)), key=lambda j: -scores[j])
+            rankings.append([candidates[j][2] for j in by_bm25 if candidates[j][2] is not None])
+            fused = reciprocal_rank_fusion(rankings, self.rrf_k)
+            scores = [fused.get(key, 0.0) for _, _, key in candidates]
+        ranked = sorted(range(len(candidates)), key=lambda j: -scores[j])
+
+        kept: Dict[int, List[SearchResult]] = {i: [] for i in range(len(tool_results))}
+        used = 0
+        for j in ranked[:self.top_k]:
+            i, r, _ = candidates[j]
+            size = len(r.title) + len(r.description) + len(r.url)
+            if used and used + size > self.max_chars:
+                break
+            used += size
+            kept[i].append(r)
+        return [dict(call, result=kept[i]) for i, call in enumerate(tool_results)]
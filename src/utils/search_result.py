@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import marshal
+import operator
+
+FORMAT_VERSION = 1
+MAGIC = b"SR"
+
+
+class SearchResult:
+    """
+    One search result with the same fields whatever the backend or method produced it.
+
+    `__slots__` keeps results small (no per-instance dict); they are shared between the caches,
+    the local index and the prompt, so treat them as immutable and use `replace` for changes.
+    """
+    __slots__ = ("url", "title", "description", "source", "duration", "uploader", "excerpt")
+
+    def __init__(self, url: str, title: str = "Untitled", description: str = "No description", source: str = "",
+                 duration: str = "", uploader: str = "", excerpt: str = "") -> None:
+        self.url = url
+        self.title = title
+        self.description = description
+        self.source = source
+        self.duration = duration
+        self.uploader = uploader
+        self.excerpt = excerpt
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SearchResult":
+        """
+        Build a result from a dict with the field names (e.g. from a plugin tool); other keys are ignored.
+        """
+        return cls(**{k: str(v) for k, v in data.items() if k in cls.__slots__ and v is not None})
+
+    @classmethod
+    def coerce(cls, value: Any) -> "SearchResult":
+        return value if isinstance(value, cls) else cls.from_dict(value)
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        The non-empty fields, e.g. for JSON responses.
+        """
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name)}
+
+    def astuple(self) -> Tuple[str, ...]:
+        return _fields(self)
+
+    def replace(self, **changes) -> "SearchResult":
+        fields = dict(zip(self.__slots__, self.astuple()))
+        fields.update(changes)
+        return SearchResult(**fields)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SearchResult) and self.astuple() == other.astuple()
+
+    def __hash__(self) -> int:
+        return hash(self.astuple())
+
+    def __repr__(self) -> str:
+        return f"SearchResult({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+
+_fields = operator.attrgetter(*SearchResult.__slots__)
+
+
+def encode_results(results: Iterable[SearchResult]) -> bytes:
+    """
+    Serialize results compactly for the cache tiers and for passing between processes: a short
+    header and the field tuples in `marshal` format, which is several times smaller and faster
+    than JSON. Only decode data written by this app; marshal is not meant for untrusted input.
+    """
+    return MAGIC + bytes([FORMAT_VERSION]) + marshal.dumps(tuple(map(_fields, results)), 4)
+
+
+def decode_results(data: bytes) -> List[SearchResult]:
+    """
+    Inverse of `encode_results`.
+    """
+    if bytes(data[:2]) != MAGIC:
+        raise ValueError("Not in the search result format")
+    if data[2] != FORMAT_VERSION:
+        raise ValueError(f"Unknown search result format version {data[2]}")
+    return [SearchResult(*row) for row in marshal.loads(bytes(data[3:]))]
+
+
+Formatter = Callable[[SearchResult], str]
+FORMATTERS: Dict[str, Formatter] = {}
+
+
+def result_formatter(tool: str) -> Callable[[Formatter], Formatter]:
+    """
+    Register how the results of a tool are written into the prompt (one line per result):
+
+        @result_formatter("search_papers")
+        def format_paper(r: SearchResult) -> str: ...
+    """
+    def decorator(func: Formatter) -> Formatter:
+        FORMATTERS[tool] = func
+        return func
+
+    return decorator
+
+
+def default_formatter(r: SearchResult) -> str:
+    return f"- {r.title} ({r.source or 'Unknown'}): {r.description} [Link: {r.url}]"
+
+
+@result_formatter("search_video")
+def video_formatter(r: SearchResult) -> str:
+    return (f"- {r.title} ({r.uploader or 'Unknown'}, Duration: {r.duration or 'N/A'}): "
+            f"{r.description} [Link: {r.url}]")
+
+
+def format_result(tool: str, r: SearchResult) -> Optional[str]:
+    """
+    The prompt line(s) of one result of `tool`, or None for a result without a link.
+    """
+    if not r.url:
+        return None
+    line = FORMATTERS.get(tool, default_formatter)(r)
+    if r.excerpt:
+        line += f"\n  Excerpt: {r.excerpt}"
+    return line
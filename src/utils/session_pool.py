@@ -0,0 +1,129 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+import threading
+import time
+
+
+class SessionPoolTimeout(TimeoutError):
+    """
+    Raised when no session became free within the pool's `acquire_timeout`.
+    """
+
+
+class _PooledSession:
+    __slots__ = ("client", "created_at", "uses")
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+
+class SessionPool:
+    """
+    A thread-safe pool of long-lived HTTP client sessions.
+
+    At most `size` sessions exist at once. Idle sessions are handed out oldest-first, sessions
+    older than `max_age` seconds or used more than `max_uses` times are recycled, and a session
+    whose call raised is discarded instead of being returned to the pool.
+    """
+    def __init__(self, factory: Callable[[], Any], size: int = 4, max_age: float = 300,
+                 max_uses: int = 200, acquire_timeout: Optional[float] = 30) -> None:
+        self.factory = factory
+        self.size = size
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle: Deque[_PooledSession] = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "discarded": 0}
+
+    def _is_stale(self, pooled: _PooledSession) -> bool:
+        return (time.monotonic() - pooled.created_at > self.max_age
+                or pooled.uses >= self.max_uses)
+
+    def _acquire(self) -> _PooledSession:
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise SessionPoolTimeout("Timed out waiting for a free search session")
+        try:
+            with self._lock:
+                while self._idle:
+                    pooled = self._idle.popleft()
+                    if not self._is_stale(pooled):
+                        self.stats["reused"] += 1
+                        return pooled
+                    self.stats["recycled"] += 1
+            pooled = _PooledSession(self.factory())
+            with self._lock:
+                self.stats["created"] += 1
+            return pooled
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, pooled: _PooledSession, healthy: bool) -> None:
+        with self._lock:
+            if healthy and not self._is_stale(pooled):
+                self._idle.append(pooled)
+            else:
+                self.stats["discarded" if not healthy else "recycled"] += 1
+        self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """
+        Borrow a session for the duration of the `with` block.
+        """
+        pooled = self._acquire()
+        pooled.uses += 1
+        try:
+            yield pooled.client
+        except BaseException:
+            self._release(pooled, healthy=False)
+            raise
+        self._release(pooled, healthy=True)
+
+    def clear(self) -> None:
+        """
+        Drop all idle sessions; sessions currently in use are dropped when returned stale.
+        """
+        with self._lock:
+            self._idle.clear()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+
+class SessionPools:
+    """
+    One `SessionPool` per distinct client configuration (e.g. proxy and timeout).
+    """
+    def __init__(self, factory: Callable[..., Any], **pool_kwargs) -> None:
+        self.factory = factory
+        self.pool_kwargs = pool_kwargs
+        self._pools: Dict[tuple, SessionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, **client_kwargs) -> SessionPool:
+        key = tuple(sorted(client_kwargs.items()))
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = SessionPool(lambda: self.factory(**client_kwargs), **self.pool_kwargs)
+                    self._pools[key] = pool
+        return pool
+
+    def session(self, **client_kwargs):
+        return self.get(**client_kwargs).session()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for pool in list(self._pools.values()):
+            for name, value in pool.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
@@ -0,0 +1,70 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import threading
+import weakref
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one: while a call for a key is in flight, later
+    callers with the same key wait for it and share its result (or its exception) instead of
+    running their own. Nothing is kept once the call returns; that is what the caches are for.
+
+    `do` works across threads (every Streamlit session in the process), `ado` across the tasks
+    of one event loop.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        self.stats = {"calls": 0, "collapsed": 0}
+
+    def do(self, key: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Return `func(*args, **kwargs)`, sharing the result with concurrent callers of the same key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["collapsed"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, factory: Callable[[], Awaitable]) -> Any:
+        """
+        Await `factory()`, sharing the result with concurrent callers of the same key on this loop.
+        The shared call keeps running if one of its callers is cancelled.
+        """
+        tasks = self._tasks.setdefault(asyncio.get_running_loop(), {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+            self.stats["calls"] += 1
+        else:
+            self.stats["collapsed"] += 1
+        return await asyncio.shield(task)
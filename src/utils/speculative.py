@@ -0,0 +1,108 @@
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import re
+import threading
+from utils.async_runtime import RUNTIME
+from utils.async_web_search import AsyncWebSearch
+from utils.telemetry import get_logger
+
+log = get_logger("speculative")
+
+
+class Speculation:
+    """
+    A text search started on the raw user input while the function-calling LLM is still deciding.
+    """
+    def __init__(self, query: str, max_results: int, future: "Future[List]") -> None:
+        self.query = query
+        self.max_results = max_results
+        self.future = future
+        self.used = False
+
+
+class SpeculativeSearch:
+    """
+    Overlaps the first web search with the function-calling LLM call.
+
+    `start` launches `search_text` on the user input right away. Once the model has picked its
+    tools, `attach` hands the speculative result to the first compatible tool call: a text search
+    whose query shares at least `min_overlap` of its words with the user input. Speculations no
+    call can use are cancelled (or, if already running, left to fill the search cache).
+    """
+    COMPATIBLE_TOOLS = ("search_text", "retrieve_results")
+
+    def __init__(self, enabled: bool = False, max_results: int = 5, min_overlap: float = 0.5) -> None:
+        self.enabled = enabled
+        self.max_results = max_results
+        self.min_overlap = min_overlap
+        self.stats = {"started": 0, "hits": 0, "wasted": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "SpeculativeSearch":
+        """
+        Build the speculative search from the `speculative_search` section of the app config.
+        """
+        return cls(**(config or {}))
+
+    @property
+    def hit_rate(self) -> float:
+        return self.stats["hits"] / self.stats["started"] if self.stats["started"] else 0.0
+
+    @property
+    def waste_rate(self) -> float:
+        return self.stats["wasted"] / self.stats["started"] if self.stats["started"] else 0.0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _words(text: str) -> set:
+        return set(re.findall(r"\w+", str(text).lower()))
+
+    def overlap(self, query: str, candidate: str) -> float:
+        """
+        Share of the candidate query's words that also appear in the speculative query.
+        """
+        candidate_words = self._words(candidate)
+        if not candidate_words:
+            return 0.0
+        return len(candidate_words & self._words(query)) / len(candidate_words)
+
+    def start(self, user_input: str) -> Optional[Speculation]:
+        if not self.enabled or not user_input.strip():
+            return None
+        self._count("started")
+        future = RUNTIME.submit(AsyncWebSearch.search_text(user_input, max_results=self.max_results))
+        return Speculation(user_input, self.max_results, future)
+
+    def attach(self, speculation: Optional[Speculation], calls: List[Dict]) -> List[Dict]:
+        """
+        Give the speculative result to the first compatible tool call as its `prefetched` future,
+        and discard the speculation if no call can use it.
+        """
+        if speculation is None:
+            return calls
+        for call in calls:
+            if call.get("error") or call.get("name") not in self.COMPATIBLE_TOOLS:
+                continue
+            # The schema allows "max_results": null, which means the default
+            if (call["args"].get("max_results") or 5) > speculation.max_results:
+                continue
+            if self.overlap(speculation.query, call["args"].get("query") or "") >= self.min_overlap:
+                call["prefetched"] = speculation.future
+                speculation.used = True
+                self._count("hits")
+                log.debug("Speculative search reused for %s(%s), hit rate %.0f%%", call["name"], call["args"],
+                          self.hit_rate * 100)
+                return calls
+        self.discard(speculation)
+        return calls
+
+    def discard(self, speculation: Optional[Speculation]) -> None:
+        if speculation is None or speculation.used:
+            return
+        speculation.future.cancel()
+        self._count("wasted")
+        log.debug("Speculative search discarded, waste rate %.0f%%", self.waste_rate * 100)
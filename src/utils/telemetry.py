@@ -0,0 +1,317 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional: spans are also exported through OpenTelemetry when it is installed
+    otel_trace = None
+
+LOGGER_NAME = "rtws"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    The q-th percentile (0-100) of `values`, linearly interpolated.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class SampledFilter(logging.Filter):
+    """
+    Passes every record at INFO and above, and only a `debug_sample_rate` share of DEBUG records.
+    """
+    def __init__(self, debug_sample_rate: float = 1.0) -> None:
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.debug_sample_rate
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(level: str = "INFO", debug_sample_rate: float = 1.0) -> None:
+    """
+    Set up the app's loggers. Records are handed to a background thread through a queue, so
+    writing them never blocks a request.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = QueueHandler(records)
+    handler.addFilter(SampledFilter(debug_sample_rate))
+    logger.addHandler(handler)
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = QueueListener(records, output)
+    _listener.start()
+
+
+class Metrics:
+    """
+    In-process counters and histograms, rendered in the Prometheus text format.
+    The `.stats` dicts the components already keep are exported as counters through `register_stats`.
+    """
+    def __init__(self, namespace: str = LOGGER_NAME, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.namespace = namespace
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, List]] = {}
+        self._help: Dict[str, str] = {}
+        self._stats: Dict[str, Callable[[], Optional[Dict]]] = {}
+
+    @staticmethod
+    def _labels(labels: Dict) -> Tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = "", **labels) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+            if help:
+                self._help.setdefault(name, help)
+
+    def register_stats(self, name: str, source: Callable[[], Optional[Dict]]) -> None:
+        """
+        Export the numeric values of the dict returned by `source` as `<name>_<key>_total`.
+        """
+        self._stats[name] = source
+
+    def _format_labels(self, labels: Tuple, extra: Optional[Tuple] = None) -> str:
+        pairs = list(labels) + list(extra or ())
+        if not pairs:
+            return ""
+        escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: (list(v[0]), v[1], v[2]) for k, v in series.items()}
+                          for name, series in self._histograms.items()}
+        for name, source in self._stats.items():
+            try:
+                stats = source() or {}
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counters.setdefault(f"{name}_{key}_total", {})[()] = value
+        for name in sorted(counters):
+            full = f"{self.namespace}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f"{full}{self._format_labels(labels)} {value}")
+        for name in sorted(histograms):
+            full = f"{self.namespace}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} histogram")
+            for labels, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full}_bucket{self._format_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{full}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{full}_count{self._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": self.start, "duration": self.duration, "error": self.error, "attributes": self.attributes}
+
+
+class Tracer:
+    """
+    Records nested spans per trace. Every finished span feeds the `span_duration_seconds`
+    histogram; the spans of the last `max_traces` traces are kept for `/traces`.
+    """
+    def __init__(self, metrics: Metrics, max_traces: int = 200) -> None:
+        self.metrics = metrics
+        self.max_traces = max_traces
+        self.logger = get_logger("trace")
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._traces: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._otel = otel_trace.get_tracer(LOGGER_NAME) if otel_trace is not None else None
+
+    @property
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Time a block as a span, a child of the current span (or the root of a new trace).
+        Works in threads and coroutines; context follows `asyncio.to_thread` and the shared runtime.
+        """
+        parent = self._current.get()
+        current = Span(name, parent.trace_id if parent else uuid.uuid4().hex, parent.span_id if parent else None,
+                       attributes)
+        token = self._current.set(current)
+        otel_span = self._otel.start_as_current_span(name, attributes=attributes) if self._otel else None
+        start = time.perf_counter()
+        try:
+            if otel_span is not None:
+                with otel_span:
+                    yield current
+            else:
+                yield current
+        except BaseException as e:
+            current.error = type(e).__name__
+            self.metrics.inc("span_errors_total", help="Spans that ended with an exception", span=name)
+            raise
+        finally:
+            current.duration = time.perf_counter() - start
+            self._current.reset(token)
+            self.metrics.observe("span_duration_seconds", current.duration,
+                                 help="Duration of each pipeline stage", span=name)
+            self._record(current)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span.to_dict())
+        self.logger.debug("span %s %.1f ms trace=%s%s", span.name, span.duration * 1000, span.trace_id,
+                          f" error={span.error}" if span.error else "")
+
+    def traces(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            recent = list(self._traces.items())[-limit:]
+        return [{"trace_id": trace_id, "spans": spans} for trace_id, spans in reversed(recent)]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = METRICS.render().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/traces":
+            body = json.dumps(TRACER.traces(), indent=2).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        get_logger("metrics").debug(format, *args)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `/metrics` (Prometheus text format) and `/traces` (recent traces as JSON) from a daemon
+    thread. Only one server is started per process; a port already in use is logged and skipped.
+    """
+    global _server
+    if _server is None:
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            get_logger("metrics").warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        get_logger("metrics").info("Metrics on http://%s:%s/metrics", host, port)
+    return _server
+
+
+def configure(config: Optional[Dict]) -> None:
+    """
+    Apply the logging and tracing settings of the `telemetry` section of the app config.
+    """
+    config = config or {}
+    configure_logging(config.get("log_level", "INFO"), config.get("debug_sample_rate", 1.0))
+    TRACER.max_traces = config.get("max_traces", TRACER.max_traces)
+
+
+def serve_metrics(config: Optional[Dict]) -> Optional[ThreadingHTTPServer]:
+    """
+    Start the metrics server configured in the `telemetry` section of the app config, if any.
+    Called by the entry points rather than on import, so that importing the app binds no port.
+    """
+    config = config or {}
+    if not config.get("metrics_port"):
+        return None
+    return start_metrics_server(config["metrics_port"], config.get("metrics_host", "127.0.0.1"))
+
+
+METRICS = Metrics()
+TRACER = Tracer(METRICS)
+span = TRACER.span
@@ -0,0 +1,172 @@
+from typing import Callable, Dict, List, Optional
+import asyncio
+import inspect
+import threading
+from inspect import Parameter
+from utils.resources import lazy_import
+from utils.web_search import WebSearch
+
+pydantic = lazy_import("pydantic")
+
+
+class Tool:
+    """
+    A callable search tool together with its lazily built pydantic input model and JSON schema.
+    """
+    def __init__(self, func: Callable, name: Optional[str] = None, description: Optional[str] = None) -> None:
+        self.func = func
+        self.name = name or func.__name__
+        self.description = description if description is not None else func.__doc__
+        self._model: Optional[type] = None
+        self._schema: Optional[Dict] = None
+
+    @property
+    def model(self) -> type:
+        """
+        The pydantic model describing the tool's input parameters, built on first use.
+        """
+        if self._model is None:
+            kw = {
+                n: (o.annotation if o.annotation != Parameter.empty else str,
+                    ... if o.default == Parameter.empty else o.default)
+                for n, o in inspect.signature(self.func).parameters.items()
+            }
+            model_config = {"arbitrary_types_allowed": True}
+            self._model = pydantic.create_model(f'Input for `{self.name}`', __config__=model_config, **kw)
+        return self._model
+
+    @property
+    def schema(self) -> Dict:
+        """
+        The OpenAI function description for the tool, built on first use.
+        """
+        if self._schema is None:
+            self._schema = dict(name=self.name, description=self.description,
+                                parameters=self.model.model_json_schema())
+        return self._schema
+
+    def validate(self, args: Dict) -> Dict:
+        """
+        Check the arguments against the cached input model and return the coerced values.
+        Unknown arguments are dropped, missing required ones raise `ValidationError`.
+        """
+        known = {k: v for k, v in args.items() if k in self.model.model_fields}
+        validated: "pydantic.BaseModel" = self.model.model_validate(known)
+        return validated.model_dump()
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+
+class ToolRegistry:
+    """
+    A registry of search tools exposed to the function-calling LLM.
+
+    Schemas are generated once per tool and reused across turns; dispatch goes through a
+    name lookup instead of an if/elif chain.
+    """
+    def __init__(self) -> None:
+        self._tools: Dict[str, Tool] = {}
+        self._schemas: Optional[List[Dict]] = None
+        self._lock = threading.Lock()
+
+    def register(self, func: Optional[Callable] = None, *, name: Optional[str] = None,
+                 description: Optional[str] = None):
+        """
+        Register a function as a tool. Can be used directly or as a decorator:
+
+            @registry.register
+            def search_papers(query: str, max_results: Optional[int] = 5) -> List: ...
+        """
+        def decorator(f: Callable) -> Callable:
+            tool = Tool(f, name=name, description=description)
+            with self._lock:
+                self._tools[tool.name] = tool
+                self._schemas = None
+            return f
+
+        if func is None:
+            return decorator
+        return decorator(func)
+
+    def unregister(self, name: str) -> None:
+        """
+        Remove a tool from the registry.
+        """
+        with self._lock:
+            self._tools.pop(name, None)
+            self._schemas = None
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def schemas(self) -> List[Dict]:
+        """
+        Return the JSON schemas of all registered tools, generating them only once.
+        """
+        schemas = self._schemas
+        if schemas is None:
+            with self._lock:
+                if self._schemas is None:
+                    self._schemas = [tool.schema for tool in self._tools.values()]
+                schemas = self._schemas
+        return schemas
+
+    def dispatch(self, name: str, args: Dict):
+        """
+        Validate the arguments against the tool's schema and call it.
+        Raises `KeyError` for unknown tools and `ValidationError` for invalid arguments.
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(f"Unknown function: {name}")
+        return tool(**tool.validate(args))
+
+    async def adispatch(self, name: str, args: Dict):
+        """
+        Async counterpart of `dispatch`. Coroutine tools are awaited directly, blocking tools
+        run on the event loop's executor.
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(f"Unknown function: {name}")
+        kwargs = tool.validate(args)
+        if inspect.iscoroutinefunction(tool.func):
+            return await tool(**kwargs)
+        return await asyncio.to_thread(tool, **kwargs)
+
+
+def _default_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    for func in (
+        WebSearch.retrieve_results,
+        WebSearch.search_text,
+        WebSearch.search_pdf,
+        WebSearch.get_instant,
+        WebSearch.search_image,
+        WebSearch.search_video,
+        WebSearch.search_news,
+        WebSearch.search_map,
+        WebSearch.give_suggestion,
+        WebSearch.user_proxy_for_text_web_search,
+    ):
+        registry.register(func)
+    return registry
+
+
+TOOLS = _default_registry()
+
+
+def register_tool(func: Optional[Callable] = None, *, name: Optional[str] = None,
+                  description: Optional[str] = None):
+    """
+    Register a plugin search tool on the default registry.
+    """
+    return TOOLS.register(func, name=name, description=description)
+
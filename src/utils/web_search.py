@@ -1,279 +1,496 @@
 # https://pypi.org/project/duckduckgo-search/
 # pip install -U duckduckgo_search
 
-from duckduckgo_search import DDGS
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import functools
+import inspect
 import time
+from utils.cache import SearchCache
+from utils.circuit_breaker import CircuitBreakers
+from utils.hedging import Hedger, SearchSkipped, current_deadline, current_route, search_budget
+from utils.local_index import LocalIndex
+from utils.rate_limiter import RateLimiter, RateLimitExceeded
+from utils.resources import lazy_import
+from utils.search_result import SearchResult
+from utils.session_pool import SessionPools, SessionPoolTimeout
+from utils.single_flight import SingleFlight
+from utils.telemetry import METRICS, get_logger, span
+
+duckduckgo_search = lazy_import("duckduckgo_search")
+log = get_logger("web_search")
+
+
+def ddgs(**kwargs):
+    """
+    A new DDGS client; duckduckgo_search is only imported when the first session is opened.
+    """
+    return duckduckgo_search.DDGS(**kwargs)
+
+
+def search_key(signature: inspect.Signature, method: str, args, kwargs) -> str:
+    """
+    The cache and single-flight key of a call to the search `method` with the given arguments.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return SearchCache.make_key(method, bound.arguments)
+
+
+def cached(func):
+    """
+    Serve repeated searches from `WebSearch.cache`. Searches whose backend just failed or found
+    nothing are remembered for a short while (`negative_ttl`) and not repeated; searches that
+    were skipped (`SearchSkipped`) return an empty list and are not remembered.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = WebSearch.cache
+        key = None
+        if cache is not None:
+            key = search_key(signature, func.__name__, args, kwargs)
+            results = cache.get(key)
+            if results is not None:
+                return results
+            if cache.recently_empty(key):
+                log.debug("%s for %r failed or found nothing moments ago; not repeated", func.__name__, key)
+                return []
+        try:
+            results = func(*args, **kwargs)
+        except SearchSkipped as e:
+            log.debug("%s skipped: %s", func.__name__, e)
+            return []
+        if cache is None:
+            return results
+        if results:
+            cache.set(key, results, ttl=cache.ttl_for(func.__name__))
+        else:
+            cache.mark_empty(key)
+        return results
+
+    return wrapper
+
+
+def coalesced(func):
+    """
+    Let concurrent identical searches share one backend call through `WebSearch.flights`.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = search_key(signature, func.__name__, args, kwargs)
+        return WebSearch.flights.do(key, func, *args, **kwargs)
+
+    return wrapper
+
+
+def indexed(func):
+    """
+    Serve searches from `WebSearch.index` when it holds enough fresh matching results, and add
+    every live result to it.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        index = WebSearch.index
+        if not index.handles(func.__name__):
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        query = bound.arguments.get("query", bound.arguments.get("keywords", ""))
+        results = index.lookup(func.__name__, query, bound.arguments.get("max_results"))
+        if results is not None:
+            log.debug("%s for %r served from the local index (%d results)", func.__name__, query, len(results))
+            return results
+        results = func(*args, **kwargs)
+        if results:
+            index.add(func.__name__, results)
+        return results
+
+    return wrapper
+
+
+def hedged(func):
+    """
+    Run a search through `WebSearch.hedger`: duplicated over an alternate route when the primary
+    is slow, and given up at the turn's search deadline. Results that arrive after the deadline
+    still go into `WebSearch.cache` and `WebSearch.index`.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        def keep_late(results: List[SearchResult]) -> None:
+            cache = WebSearch.cache
+            if cache is not None:
+                cache.set(search_key(signature, func.__name__, args, kwargs), results,
+                          ttl=cache.ttl_for(func.__name__))
+            if WebSearch.index.handles(func.__name__):
+                WebSearch.index.add(func.__name__, results)
+
+        return WebSearch.hedger.call(func.__name__, func, *args, on_late=keep_late, **kwargs)
+
+    return wrapper
+
+
+def rate_limited(func):
+    """
+    Run a search under the shared `WebSearch.limiter`, retrying throttled requests with backoff,
+    and behind the circuit breaker of its backend and method.
+    Searches that stay throttled or fail return an empty list instead of raising. Searches that
+    never reach the backend (open circuit, no request slot or session in time) raise `SearchSkipped`.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        query = args[0] if args else kwargs.get("query", kwargs.get("keywords"))
+        backend = WebSearch.backend_for(func.__name__)
+        if not WebSearch.breakers.allow(backend, func.__name__):
+            METRICS.inc("search_circuit_open_total", help="Searches refused because the backend's circuit is open",
+                        method=func.__name__, backend=backend)
+            raise SearchSkipped(f"circuit open for {backend}")
+        try:
+            with span(f"search.{func.__name__}", **current_route()):
+                # Throttled retries never wait past the turn's search deadline
+                deadline = current_deadline()
+                if deadline is not None:
+                    deadline = min(deadline, time.monotonic() + WebSearch.limiter.deadline)
+                results = WebSearch.limiter.call(func, *args, deadline=deadline, **kwargs)
+            WebSearch.breakers.record(backend, func.__name__, True)
+            return results
+        except RateLimitExceeded as e:
+            # Only throttling by the backend counts against it, not waiting for a local request slot
+            if e.__cause__ is None:
+                WebSearch.breakers.record(backend, func.__name__, None)
+                raise SearchSkipped(str(e)) from e
+            WebSearch.breakers.record(backend, func.__name__, False)
+            METRICS.inc("search_rate_limited_total", help="Searches given up because the backend kept throttling",
+                        method=func.__name__)
+            log.warning("Rate limit hit for %r in %s: %s. Returning no results.", query, func.__name__, e)
+            return []
+        except SessionPoolTimeout as e:
+            # Every session was busy, so the backend was never asked
+            WebSearch.breakers.record(backend, func.__name__, None)
+            raise SearchSkipped(str(e)) from e
+        except Exception as e:
+            WebSearch.breakers.record(backend, func.__name__, False)
+            METRICS.inc("search_errors_total", help="Searches that failed", method=func.__name__)
+            log.warning("Error in %s for %r: %s", func.__name__, query, e)
+            return []
+
+    return wrapper
+
 
 class WebSearch:
+    DEFAULT_BACKEND = "duckduckgo"
+    PROXY = "socks5://localhost:9150"
+    cache: Optional[SearchCache] = SearchCache()
+    sessions: SessionPools = SessionPools(ddgs)
+    limiter: RateLimiter = RateLimiter()
+    index: LocalIndex = LocalIndex(enabled=False)
+    flights: SingleFlight = SingleFlight()
+    hedger: Hedger = Hedger(enabled=False)
+    breakers: CircuitBreakers = CircuitBreakers(enabled=False)
+    timeout: int = 30
+
+    @classmethod
+    def configure(cls, search_cache: Optional[Dict] = None, session_pool: Optional[Dict] = None,
+                  rate_limit: Optional[Dict] = None, local_index: Optional[Dict] = None,
+                  hedging: Optional[Dict] = None, circuit_breaker: Optional[Dict] = None) -> None:
+        """
+        Apply the search settings from the app config.
+        """
+        cls.cache = SearchCache.from_config(search_cache)
+        cls.limiter = RateLimiter.from_config(rate_limit)
+        cls.index = LocalIndex.from_config(local_index)
+        cls.hedger = Hedger.from_config(hedging)
+        cls.breakers = CircuitBreakers.from_config(circuit_breaker)
+        session_pool = dict(session_pool or {})
+        cls.timeout = session_pool.pop("timeout", cls.timeout)
+        cls.sessions = SessionPools(ddgs, **session_pool)
+
+    @classmethod
+    def _session(cls, proxy: Optional[str] = None, timeout: Optional[int] = None):
+        """
+        Borrow a pooled DDGS session for the given proxy and timeout. Without an explicit proxy,
+        the route of the current (possibly hedged) attempt is used.
+        """
+        route = current_route()
+        return cls.sessions.session(proxy=proxy or route.get("proxy"),
+                                    timeout=timeout or route.get("timeout", cls.timeout))
+
+    @classmethod
+    def backend_for(cls, method: str) -> str:
+        """
+        The backend a search of `method` goes to in the current context: the proxy or DuckDuckGo.
+        """
+        if method == "user_proxy_for_text_web_search":
+            return cls.PROXY
+        return current_route().get("proxy") or cls.DEFAULT_BACKEND
+
+    @classmethod
+    def available(cls, method: str) -> bool:
+        """
+        Whether a search of `method` could reach a backend now: False while the circuit breakers
+        of its backend and of every hedging route are open. Unknown methods count as available.
+        """
+        if method == "user_proxy_for_text_web_search":
+            return not cls.breakers.is_open(cls.PROXY, method)
+        backends = [cls.DEFAULT_BACKEND]
+        if cls.hedger.enabled:
+            backends += [route["proxy"] for route in cls.hedger.routes if route.get("proxy")]
+        return any(not cls.breakers.is_open(backend, method) for backend in backends)
+
+    @classmethod
+    @contextmanager
+    def budget(cls, seconds: Optional[float] = None) -> Iterator[Optional[float]]:
+        """
+        Limit every search started inside the block to `seconds` (default: the configured
+        `hedging.budget`) from now. See `utils.hedging.search_budget`.
+        """
+        with search_budget(seconds if seconds is not None else cls.hedger.budget) as deadline:
+            yield deadline
+
     @staticmethod
-    def retrieve_results(query: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def retrieve_results(query: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Retrieve search results from duckduckgo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("href", ""),
-                        "description": r.get("body", "No description")
-                    }
-                    for r in ddgs.text(query, max_results=max_results)
-                    if r.get("href", "")
-                ]
-                print(f"retrieve_results for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.retrieve_results(query, max_results)
-            print(f"Error in retrieve_results for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("href", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("body", "No description")
+                )
+                for r in ddgs.text(query, max_results=max_results)
+                if r.get("href", "")
+            ]
+            log.debug("retrieve_results for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def search_text(query: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_text(query: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for text on duckduckgo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("href", ""),
-                        "description": r.get("body", "No description")
-                    }
-                    for r in ddgs.text(query, region='wt-wt', safesearch='off', timelimit='y', max_results=max_results)
-                    if r.get("href", "")
-                ]
-                print(f"search_text for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_text(query, max_results)
-            print(f"Error in search_text for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("href", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("body", "No description")
+                )
+                for r in ddgs.text(query, region='wt-wt', safesearch='off', timelimit='y', max_results=max_results)
+                if r.get("href", "")
+            ]
+            log.debug("search_text for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def search_pdf(query: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_pdf(query: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for PDF files on duckduckgo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("href", ""),
-                        "description": r.get("body", "No description")
-                    }
-                    for r in ddgs.text(
-                        f"{query} filetype:pdf site:*.edu | site:*.org | site:*.gov | site:*.io -inurl:(signup | login)",
-                        region='wt-wt', safesearch='off', timelimit='y', max_results=max_results
-                    )
-                    if r.get("href", "").lower().endswith(".pdf")
-                ]
-                print(f"search_pdf for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_pdf(query, max_results)
-            print(f"Error in search_pdf for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("href", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("body", "No description")
+                )
+                for r in ddgs.text(
+                    f"{query} filetype:pdf site:*.edu | site:*.org | site:*.gov | site:*.io -inurl:(signup | login)",
+                    region='wt-wt', safesearch='off', timelimit='y', max_results=max_results
+                )
+                if r.get("href", "").lower().endswith(".pdf")
+            ]
+            log.debug("search_pdf for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def get_instant(query: str) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def get_instant(query: str) -> List[SearchResult]:
         """
         Retrieve instant answers from DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("text", "Untitled"),
-                        "url": r.get("url", ""),
-                        "description": r.get("text", "No description")
-                    }
-                    for r in ddgs.answers(query)
-                    if r.get("url", "")
-                ]
-                print(f"get_instant for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.get_instant(query)
-            print(f"Error in get_instant for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("url", ""),
+                    title=r.get("text", "Untitled"),
+                    description=r.get("text", "No description")
+                )
+                for r in ddgs.answers(query)
+                if r.get("url", "")
+            ]
+            log.debug("get_instant for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def search_image(keywords: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_image(keywords: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for images on DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("image", ""),
-                        "description": r.get("source", "No description")
-                    }
-                    for r in ddgs.images(
-                        keywords, region="us-en", safesearch="on", max_results=max_results
-                    )
-                    if r.get("image", "")
-                ]
-                print(f"search_image for '{keywords}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{keywords}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_image(keywords, max_results)
-            print(f"Error in search_image for '{keywords}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("image", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("source", "No description")
+                )
+                for r in ddgs.images(
+                    keywords, region="us-en", safesearch="on", max_results=max_results
+                )
+                if r.get("image", "")
+            ]
+            log.debug("search_image for %r: %d results", keywords, len(results))
+            return results
 
     @staticmethod
-    def search_video(keywords: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_video(keywords: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for videos on DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("content", ""),
-                        "description": r.get("description", "No description"),
-                        "duration": r.get("duration", "N/A"),
-                        "uploader": r.get("uploader", "Unknown")
-                    }
-                    for r in ddgs.videos(
-                        f"{keywords} site:youtube.com | site:vimeo.com -inurl:(signup | login)",
-                        region="wt-wt", safesearch="off", timelimit="y", resolution="high", duration="medium", max_results=max_results
-                    )
-                    if r.get("content", "") and ("youtube.com" in r.get("content", "").lower() or "vimeo.com" in r.get("content", "").lower())
-                ]
-                print(f"search_video for '{keywords}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{keywords}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_video(keywords, max_results)
-            print(f"Error in search_video for '{keywords}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("content", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("description", "No description"),
+                    duration=r.get("duration", "N/A"),
+                    uploader=r.get("uploader", "Unknown")
+                )
+                for r in ddgs.videos(
+                    f"{keywords} site:youtube.com | site:vimeo.com -inurl:(signup | login)",
+                    region="wt-wt", safesearch="off", timelimit="y", resolution="high", duration="medium", max_results=max_results
+                )
+                if r.get("content", "") and ("youtube.com" in r.get("content", "").lower() or "vimeo.com" in r.get("content", "").lower())
+            ]
+            log.debug("search_video for %r: %d results", keywords, len(results))
+            return results
 
     @staticmethod
-    def search_news(keywords: str, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_news(keywords: str, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for news articles on DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("url", ""),
-                        "description": r.get("description", "No description"),
-                        "source": r.get("source", "Unknown")
-                    }
-                    for r in ddgs.news(
-                        keywords, region="wt-wt", safesearch="off", timelimit="m", max_results=max_results
-                    )
-                    if r.get("url", "")
-                ]
-                print(f"search_news for '{keywords}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{keywords}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_news(keywords, max_results)
-            print(f"Error in search_news for '{keywords}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("url", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("description", "No description"),
+                    source=r.get("source", "Unknown")
+                )
+                for r in ddgs.news(
+                    keywords, region="wt-wt", safesearch="off", timelimit="m", max_results=max_results
+                )
+                if r.get("url", "")
+            ]
+            log.debug("search_news for %r: %d results", keywords, len(results))
+            return results
 
     @staticmethod
-    def search_map(query: str, place: str = "Ottawa", max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def search_map(query: str, place: str = "Ottawa", max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for maps on DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("url", ""),
-                        "description": r.get("address", "No description")
-                    }
-                    for r in ddgs.maps(query, place=place, max_results=max_results)
-                    if r.get("url", "")
-                ]
-                print(f"search_map for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.search_map(query, place, max_results)
-            print(f"Error in search_map for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("url", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("address", "No description")
+                )
+                for r in ddgs.maps(query, place=place, max_results=max_results)
+                if r.get("url", "")
+            ]
+            log.debug("search_map for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def give_suggestion(query: str) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @hedged
+    @rate_limited
+    def give_suggestion(query: str) -> List[SearchResult]:
         """
         Retrieve search suggestions from DuckDuckGo.com with rate limit handling.
         """
-        try:
-            with DDGS(timeout=30) as ddgs:
-                results = [
-                    {
-                        "title": r.get("text", "Untitled"),
-                        "url": "",
-                        "description": r.get("text", "No description")
-                    }
-                    for r in ddgs.suggestions(query)
-                ]
-                print(f"give_suggestion for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.give_suggestion(query)
-            print(f"Error in give_suggestion for '{query}': {str(e)}")
-            return []
+        with WebSearch._session() as ddgs:
+            results = [
+                SearchResult(
+                    url="",
+                    title=r.get("text", "Untitled"),
+                    description=r.get("text", "No description")
+                )
+                for r in ddgs.suggestions(query)
+            ]
+            log.debug("give_suggestion for %r: %d results", query, len(results))
+            return results
 
     @staticmethod
-    def user_proxy_for_text_web_search(query: str, timeout: Optional[int] = 20, max_results: Optional[int] = 5) -> List:
+    @cached
+    @coalesced
+    @indexed
+    @rate_limited
+    def user_proxy_for_text_web_search(query: str, timeout: Optional[int] = 20, max_results: Optional[int] = 5) -> List[SearchResult]:
         """
         Search for text on DuckDuckGo.com using a user-defined proxy with rate limit handling.
         """
-        try:
-            with DDGS(proxies="socks5://localhost:9150", timeout=timeout) as ddgs:
-                results = [
-                    {
-                        "title": r.get("title", "Untitled"),
-                        "url": r.get("href", ""),
-                        "description": r.get("body", "No description")
-                    }
-                    for r in ddgs.text(query, max_results=max_results)
-                    if r.get("href", "")
-                ]
-                print(f"user_proxy_for_text_web_search for '{query}': {results}")
-                return results
-        except Exception as e:
-            if "Ratelimit" in str(e):
-                print(f"Rate limit hit for '{query}'. Retrying after delay...")
-                time.sleep(5)
-                return WebSearch.user_proxy_for_text_web_search(query, timeout, max_results)
-            print(f"Error in user_proxy_for_text_web_search for '{query}': {str(e)}")
-            return []
\ No newline at end of file
+        with WebSearch._session(proxy=WebSearch.PROXY, timeout=timeout) as ddgs:
+            results = [
+                SearchResult(
+                    url=r.get("href", ""),
+                    title=r.get("title", "Untitled"),
+                    description=r.get("body", "No description")
+                )
+                for r in ddgs.text(query, max_results=max_results)
+                if r.get("href", "")
+            ]
+            log.debug("user_proxy_for_text_web_search for %r: %d results", query, len(results))
+            return results
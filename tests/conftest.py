@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules as `utils.*`, with src/ on the path (see src/app.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
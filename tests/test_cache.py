@@ -0,0 +1,48 @@
+import time
+from utils.cache import SearchCache, TieredCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TieredCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = TieredCache()
+    cache.set("a", 1, ttl=0.05)
+    cache.set("b", 2, ttl=0)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    TieredCache(db_path=db_path).set("a", {"title": "Solar record"})
+    cache = TieredCache(db_path=db_path)
+    assert cache.get("a") == {"title": "Solar record"}
+    assert cache.stats["disk_hits"] == 1
+    assert cache.get("a") == {"title": "Solar record"}
+    assert cache.stats["memory_hits"] == 1
+
+
+def test_keys_normalize_the_query():
+    assert SearchCache.make_key("search_news", {"keywords": "  Solar   Record", "max_results": 5}) == \
+        SearchCache.make_key("search_news", {"keywords": "solar record", "max_results": 5})
+    assert SearchCache.make_key("search_news", {"keywords": "solar", "max_results": 5}) != \
+        SearchCache.make_key("search_news", {"keywords": "solar", "max_results": 10})
+
+
+def test_ttl_per_method():
+    cache = SearchCache(ttls={"search_news": 60}, default_ttl=100)
+    assert cache.ttl_for("search_news") == 60
+    assert cache.ttl_for("search_pdf") == SearchCache.DEFAULT_TTLS["search_pdf"]
+    assert cache.ttl_for("search_text") == 100
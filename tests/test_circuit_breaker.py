@@ -0,0 +1,62 @@
+import time
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("ddg/search_text", failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_lets_one_trial_call_through_when_half_open():
+    breaker = CircuitBreaker("ddg/search_text", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker("ddg/search_text", failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_released_trial_lets_the_next_one_through():
+    breaker = CircuitBreaker("ddg/search_text", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_breakers_are_kept_per_backend_and_method():
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    breakers.record("duckduckgo", "search_news", False)
+    assert breakers.is_open("duckduckgo", "search_news")
+    assert not breakers.is_open("duckduckgo", "search_text")
+    assert not breakers.is_open("socks5://localhost:9150", "search_news")
+    assert not breakers.allow("duckduckgo", "search_news")
+    assert breakers.stats == {"opened": 1, "rejected": 1}
+
+
+def test_disabled_breakers_allow_everything():
+    breakers = CircuitBreakers(enabled=False, failure_threshold=1)
+    breakers.record("duckduckgo", "search_news", False)
+    assert breakers.allow("duckduckgo", "search_news")
+    assert not breakers.is_open("duckduckgo", "search_news")
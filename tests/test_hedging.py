@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+from utils.hedging import Hedger, SearchSkipped, current_route, remaining_budget, search_budget
+
+PROXY = {"proxy": "socks5://localhost:9150"}
+
+
+def hedger(**kwargs) -> Hedger:
+    kwargs.setdefault("initial_delay", 0.05)
+    kwargs.setdefault("max_hedge_ratio", 1.0)
+    return Hedger(**kwargs)
+
+
+def test_budget_is_only_ever_shortened():
+    with search_budget(10):
+        with search_budget(0.5):
+            assert remaining_budget() <= 0.5
+            with search_budget(5):
+                assert remaining_budget() <= 0.5
+    assert remaining_budget() is None
+
+
+def test_slow_primary_is_hedged_over_the_next_route():
+    def search():
+        if current_route():
+            return ["from the proxy"]
+        time.sleep(0.5)
+        return ["from the primary"]
+
+    h = hedger(routes=[PROXY])
+    assert h.call("search_text", search) == ["from the proxy"]
+    assert h.stats["hedged"] == 1 and h.stats["hedge_wins"] == 1
+
+
+def test_empty_answer_is_final():
+    routes = []
+
+    def search():
+        routes.append(current_route())
+        return []
+
+    h = hedger(routes=[PROXY])
+    assert h.call("search_text", search) == []
+    assert routes == [{}]
+    assert h.stats["hedged"] == 0
+
+
+def test_skipped_primary_is_hedged_right_away():
+    def search():
+        if not current_route():
+            raise SearchSkipped("circuit open for duckduckgo")
+        return ["from the proxy"]
+
+    h = hedger(routes=[PROXY], initial_delay=10)
+    assert h.call("search_text", search) == ["from the proxy"]
+
+
+def test_skipped_on_every_route_raises():
+    def search():
+        raise SearchSkipped("circuit open")
+
+    with pytest.raises(SearchSkipped):
+        hedger(routes=[PROXY]).call("search_text", search)
+
+
+def test_deadline_raises_and_hands_late_results_on():
+    late = []
+    arrived = threading.Event()
+
+    def keep(results):
+        late.append(results)
+        arrived.set()
+
+    def search():
+        time.sleep(0.2)
+        return ["late"]
+
+    h = hedger()
+    with search_budget(0.05):
+        start = time.monotonic()
+        with pytest.raises(SearchSkipped):
+            h.call("search_news", search, on_late=keep)
+        assert time.monotonic() - start < 0.15
+    assert arrived.wait(1)
+    assert late == [["late"]]
+    assert h.stats["deadline_expired"] == 1 and h.stats["late_results"] == 1
+
+
+def test_exhausted_budget_skips_without_calling():
+    calls = []
+    with search_budget(0):
+        with pytest.raises(SearchSkipped):
+            hedger().call("search_news", lambda: calls.append(1))
+    assert calls == []
+
+
+def test_disabled_hedger_calls_directly():
+    assert Hedger(enabled=False).call("search_text", lambda query: [query], "rust") == ["rust"]
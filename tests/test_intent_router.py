@@ -0,0 +1,32 @@
+import pytest
+from utils.intent_router import IntentRouter
+
+
+@pytest.mark.parametrize("text", [
+    "Apple Watch Series 9 battery life",
+    "Is fake news a problem in elections",
+    "What should I watch out for when buying a used car",
+    "How do I convert a PDF to Word?",
+    "what is a pdf file?",
+    "tell me about the youtube company history",
+    "how to write a good headline",
+])
+def test_single_trigger_words_do_not_route(text):
+    assert IntentRouter().route(text) is None
+
+
+@pytest.mark.parametrize("text, tool, keywords", [
+    ("latest news on the Apple Watch", "search_news", "Apple Watch"),
+    ("videos about Apple Watch Series 9", "search_video", "Apple Watch Series 9"),
+    ("python decorators tutorial on youtube", "search_video", "python decorators tutorial"),
+    ("search youtube for lofi music", "search_video", "lofi music"),
+    ("pdf of the RISC-V spec", "search_pdf", "RISC-V spec"),
+    ("find a pdf about the RISC-V spec", "search_pdf", "RISC-V spec"),
+    ("latest headlines on the economy", "search_news", "economy"),
+    ("Apple Watch videos of unboxing", "search_video", "Apple Watch unboxing"),
+    ("latest Apple Watch news", "search_news", "Apple Watch"),
+])
+def test_phrases_route_and_keep_the_entity(text, tool, keywords):
+    call = IntentRouter().route(text)
+    assert call["name"] == tool
+    assert call["args"][IntentRouter.KEYWORD_ARG[tool]] == keywords
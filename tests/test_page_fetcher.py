@@ -0,0 +1,165 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import threading
+import time
+import pytest
+from utils.page_fetcher import BlockedURL, PageFetcher
+
+HTML = b"""<html><head><title>Test page</title><script>var hidden = 1;</script></head>
+<body><nav>Menu</nav><h1>Solar panels</h1><p>Panels convert sunlight into electricity.</p></body></html>"""
+
+
+def make_pdf(text: str) -> bytes:
+    """
+    A one-page PDF showing `text` in Helvetica.
+    """
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/page.html":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.reply(HTML, "text/html; charset=utf-8", ETag='"v1"')
+        elif self.path == "/paper.pdf":
+            self.reply(make_pdf("Quantum error correction"), "application/pdf")
+        elif self.path == "/large.pdf":
+            self.reply(make_pdf("Quantum error correction") + b"%" * 200_000, "application/pdf")
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/page.html")
+            self.end_headers()
+        elif self.path == "/large.txt":
+            self.reply(b"x" * 200_000, "text/plain")
+        elif self.path == "/slow.html":
+            time.sleep(1.5)
+            self.reply(HTML, "text/html")
+        else:
+            self.send_error(404)
+
+    def reply(self, body: bytes, content_type: str, **headers):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    Handler.requests.clear()
+    return PageFetcher(enabled=True, deadline=1.0, request_timeout=5.0, verify=False, allow_private_addresses=True)
+
+
+def test_extracts_readable_html_text(base_url, fetcher):
+    text = asyncio.run(fetcher.fetch_text(f"{base_url}/page.html"))
+    assert "Panels convert sunlight into electricity." in text
+    assert "Solar panels" in text
+    assert "hidden" not in text and "Menu" not in text
+
+
+def test_extracts_pdf_text(base_url, fetcher):
+    pytest.importorskip("pypdf")
+    text = asyncio.run(fetcher.fetch_text(f"{base_url}/paper.pdf"))
+    assert "Quantum error correction" in text
+
+
+def test_stops_reading_at_max_bytes(base_url, fetcher):
+    fetcher.max_bytes = 1000
+    text = asyncio.run(fetcher.fetch_text(f"{base_url}/large.txt"))
+    assert text == "x" * 1000
+
+
+def test_skips_pdfs_cut_off_at_the_limit(base_url, fetcher):
+    fetcher.max_bytes = fetcher.max_pdf_bytes = 1000
+    assert asyncio.run(fetcher.fetch_text(f"{base_url}/large.pdf")) == ""
+    assert fetcher.stats["too_large"] == 1
+
+
+def test_follows_redirects(base_url, fetcher):
+    text = asyncio.run(fetcher.fetch_text(f"{base_url}/moved"))
+    assert "Panels convert sunlight into electricity." in text
+    assert [path for path, _ in Handler.requests] == ["/moved", "/page.html"]
+
+
+@pytest.mark.parametrize("url", [
+    "{base_url}/page.html",
+    "http://localhost/",
+    "http://10.0.0.1/",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/",
+    "file:///etc/passwd",
+])
+def test_refuses_non_public_addresses(base_url, fetcher, url):
+    fetcher.allow_private_addresses = False
+    with pytest.raises(BlockedURL):
+        asyncio.run(fetcher.fetch_text(url.format(base_url=base_url)))
+    assert Handler.requests == []
+
+
+def test_revalidates_stale_pages_with_etag(base_url, fetcher):
+    url = f"{base_url}/page.html"
+    first = asyncio.run(fetcher.fetch_text(url))
+    asyncio.run(fetcher.fetch_text(url))
+    assert fetcher.stats["cached"] == 1
+    assert len(Handler.requests) == 1
+
+    fetcher.fresh_for = 0
+    again = asyncio.run(fetcher.fetch_text(url))
+    assert again == first
+    assert Handler.requests[-1] == ("/page.html", '"v1"')
+    assert fetcher.stats["revalidated"] == 1
+    assert fetcher.stats["fetched"] == 1
+
+
+def test_drops_pages_still_loading_at_the_deadline(base_url, fetcher):
+    urls = [f"{base_url}/page.html", f"{base_url}/slow.html"]
+    start = time.monotonic()
+    pages = asyncio.run(fetcher.fetch_many(urls, "solar panels", deadline=0.5))
+    assert time.monotonic() - start < 1.4
+    assert list(pages) == [urls[0]]
+    assert fetcher.stats["timed_out"] == 1
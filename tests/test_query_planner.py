@@ -0,0 +1,36 @@
+import pytest
+from utils.query_planner import QueryPlanner
+
+
+@pytest.mark.parametrize("text", [
+    "Thanks. Can you rewrite your answer in two sentences?",
+    "Hi. What is the capital of France?",
+    "Translate this to French; keep it short",
+    "Write a haiku about autumn. Make it rhyme.",
+    "I love pizza. What toppings are best?",
+    "Explain recursion. Give an example in Python.",
+])
+def test_conversation_and_single_questions_are_not_planned(text):
+    assert QueryPlanner().plan(text) == []
+
+
+def test_plans_one_search_per_part():
+    calls = QueryPlanner().plan("What are the latest Rust releases and how does Rust compare to Go for web servers?")
+    assert [call["name"] for call in calls] == ["search_text", "search_text", "search_news"]
+    assert calls[0]["args"]["query"] == "latest Rust releases"
+    assert all(call["planned"] for call in calls)
+
+
+@pytest.mark.parametrize("text, queries", [
+    ("What is 2+2? What is 3+3?", ["2+2", "3+3"]),
+    ("What is Rust and how does it compare to Go?", ["Rust", "Rust compare Go"]),
+    ("What are the best electric cars and which ones are cheapest?", ["best electric cars", "best electric cars cheapest"]),
+])
+def test_only_clauses_that_refer_back_are_prefixed(text, queries):
+    assert [call["args"]["query"] for call in QueryPlanner().plan(text)] == queries
+
+
+def test_news_search_uses_the_clause_that_asked_for_it():
+    calls = QueryPlanner().plan("What is a perovskite cell? What are the latest solar efficiency records?")
+    assert calls[-1]["name"] == "search_news"
+    assert calls[-1]["args"]["keywords"] == "latest solar efficiency records"
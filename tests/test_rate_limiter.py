@@ -0,0 +1,71 @@
+import time
+import pytest
+from utils.rate_limiter import RateLimitExceeded, RateLimiter, TokenBucket
+
+
+class RatelimitException(Exception):
+    pass
+
+
+def throttled(times: int, result="ok"):
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) <= times:
+            raise RatelimitException("202 Ratelimit")
+        return result
+
+    return func, calls
+
+
+def test_bucket_allows_a_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire() and bucket.acquire()
+    start = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_bucket_gives_up_at_the_deadline():
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(deadline=time.monotonic() + 0.05)
+
+
+def test_retries_throttled_calls():
+    limiter = RateLimiter(rate=100, burst=10, max_retries=3, base_delay=0.01, max_delay=0.02)
+    func, calls = throttled(2)
+    assert limiter.call(func) == "ok"
+    assert len(calls) == 3
+    assert limiter.stats["throttled"] == 2 and limiter.stats["retries"] == 2
+
+
+def test_gives_up_after_max_retries_with_the_backend_error_as_cause():
+    limiter = RateLimiter(rate=100, burst=10, max_retries=1, base_delay=0.01, max_delay=0.02)
+    func, calls = throttled(5)
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.call(func)
+    assert isinstance(error.value.__cause__, RatelimitException)
+    assert len(calls) == 2
+
+
+def test_waiting_for_a_request_slot_has_no_cause():
+    limiter = RateLimiter(rate=0.1, burst=1)
+    limiter.call(lambda: None)
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.call(lambda: None, deadline=time.monotonic() + 0.05)
+    assert error.value.__cause__ is None
+
+
+def test_other_errors_are_not_retried():
+    limiter = RateLimiter(rate=100, burst=10)
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        limiter.call(func)
+    assert len(calls) == 1
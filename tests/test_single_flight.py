@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import pytest
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        release.wait(2)
+        return ["result"]
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.do, "search_text:rust", search) for _ in range(5)]
+        while flights.stats["calls"] + flights.stats["collapsed"] < 5:
+            pass
+        release.set()
+        results = [f.result(timeout=2) for f in futures]
+
+    assert results == [["result"]] * 5
+    assert len(calls) == 1
+    assert flights.stats == {"calls": 1, "collapsed": 4}
+
+
+def test_callers_share_the_exception():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def search():
+        release.wait(2)
+        raise ValueError("backend down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(flights.do, "key", search) for _ in range(2)]
+        while flights.stats["calls"] + flights.stats["collapsed"] < 2:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=2)
+
+
+def test_nothing_is_kept_after_the_call():
+    flights = SingleFlight()
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+    assert flights.stats["collapsed"] == 0
+
+
+def test_async_callers_share_one_task():
+    flights = SingleFlight()
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    async def main():
+        return await asyncio.gather(*(flights.ado("key", search) for _ in range(3)))
+
+    assert asyncio.run(main()) == [["result"]] * 3
+    assert len(calls) == 1
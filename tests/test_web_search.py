@@ -0,0 +1,108 @@
+import time
+import pytest
+from utils.cache import SearchCache
+from utils.circuit_breaker import CircuitBreakers
+from utils.hedging import Hedger
+from utils.local_index import LocalIndex
+from utils.rate_limiter import RateLimiter
+from utils.session_pool import SessionPools
+from utils.single_flight import SingleFlight
+from utils.web_search import WebSearch
+
+NEWS = [{"url": "https://example.com/a", "title": "Solar record", "body": "", "source": "Example"}]
+
+
+class FakeDDGS:
+    latency = 0.0
+    answer = NEWS
+    error = None
+    calls = 0
+
+    def __init__(self, proxy=None, timeout=None):
+        pass
+
+    def news(self, keywords, **kwargs):
+        FakeDDGS.calls += 1
+        time.sleep(FakeDDGS.latency)
+        if FakeDDGS.error is not None:
+            raise FakeDDGS.error
+        return FakeDDGS.answer
+
+
+@pytest.fixture(autouse=True)
+def web_search(monkeypatch):
+    monkeypatch.setattr(FakeDDGS, "latency", 0.0)
+    monkeypatch.setattr(FakeDDGS, "answer", NEWS)
+    monkeypatch.setattr(FakeDDGS, "error", None)
+    monkeypatch.setattr(FakeDDGS, "calls", 0)
+    monkeypatch.setattr(WebSearch, "cache", SearchCache())
+    monkeypatch.setattr(WebSearch, "sessions", SessionPools(FakeDDGS))
+    monkeypatch.setattr(WebSearch, "limiter", RateLimiter(rate=100, burst=100))
+    monkeypatch.setattr(WebSearch, "index", LocalIndex(enabled=False))
+    monkeypatch.setattr(WebSearch, "flights", SingleFlight())
+    hedger = Hedger(routes=[])
+    monkeypatch.setattr(WebSearch, "hedger", hedger)
+    monkeypatch.setattr(WebSearch, "breakers", CircuitBreakers(failure_threshold=1, reset_timeout=60))
+    yield
+    # Searches abandoned at a deadline must not finish into the next test's cache
+    if hedger._executor is not None:
+        hedger._executor.shutdown(wait=True)
+
+
+def test_results_are_cached():
+    assert WebSearch.search_news("solar")[0].url == NEWS[0]["url"]
+    WebSearch.search_news("Solar ")
+    assert FakeDDGS.calls == 1
+
+
+def test_empty_answer_is_negative_cached():
+    FakeDDGS.answer = []
+    assert WebSearch.search_news("solar") == []
+    FakeDDGS.answer = NEWS
+    assert WebSearch.search_news("solar") == []
+    assert FakeDDGS.calls == 1
+
+
+def test_backend_error_is_negative_cached():
+    FakeDDGS.error = RuntimeError("connection reset")
+    assert WebSearch.search_news("solar") == []
+    FakeDDGS.error = None
+    assert WebSearch.search_news("solar") == []
+    assert FakeDDGS.calls == 1
+
+
+def test_search_dropped_at_the_deadline_is_not_negative_cached():
+    FakeDDGS.latency = 0.3
+    with WebSearch.budget(0.05):
+        assert WebSearch.search_news("solar") == []
+    assert WebSearch.cache.stats["sets"] == 0
+    FakeDDGS.latency = 0.0
+    assert WebSearch.search_news("solar")
+
+
+def test_late_result_fills_the_cache():
+    FakeDDGS.latency = 0.2
+    with WebSearch.budget(0.05):
+        assert WebSearch.search_news("solar") == []
+    time.sleep(0.4)
+    assert WebSearch.cache.stats["sets"] == 1
+    assert WebSearch.search_news("solar")
+    assert FakeDDGS.calls == 1
+
+
+def test_search_refused_by_an_open_circuit_is_not_negative_cached():
+    WebSearch.breakers.record(WebSearch.DEFAULT_BACKEND, "search_news", False)
+    assert WebSearch.search_news("solar") == []
+    assert FakeDDGS.calls == 0
+    WebSearch.breakers.record(WebSearch.DEFAULT_BACKEND, "search_news", True)
+    assert WebSearch.search_news("solar")
+    assert FakeDDGS.calls == 1
+
+
+def test_search_without_a_free_session_is_not_negative_cached(monkeypatch):
+    monkeypatch.setattr(WebSearch, "sessions", SessionPools(FakeDDGS, size=1, acquire_timeout=0.01))
+    with WebSearch._session():
+        assert WebSearch.search_news("solar") == []
+    assert WebSearch.cache.stats["sets"] == 0
+    assert WebSearch.breakers.allow(WebSearch.DEFAULT_BACKEND, "search_news")
+    assert WebSearch.search_news("solar")